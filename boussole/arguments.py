@@ -0,0 +1,128 @@
+import argparse
+import os
+
+# Name of the ETag cache file when --etag-cache is a directory, like a workspace.
+ETAG_CACHE_FILE = "etags.json"
+
+# (argument, description, environment variable) of the mandatory arguments.
+_REQUIRED_ARGUMENTS = (
+    ("github_token", "GitHub API token", "GITHUB_TOKEN"),
+    ("pr_num", "PR number", "GH_PR_NUM"),
+    ("pr_sender", "PR sender", "GH_PR_SENDER"),
+    ("comment_sender", "Comment sender", "GH_COMMENT_SENDER"),
+    ("repo_owner", "Repository owner", "GH_REPO_OWNER"),
+    ("repo_name", "Repository name", "GH_REPO_NAME"),
+    ("trigger_comment", "Trigger comment", "PAC_TRIGGER_COMMENT"),
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Manage prow-like commands on a GitHub PullRequest.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,  # Show default values in help
+    )
+    # LGTM threshold argument
+    parser.add_argument(
+        "--lgtm-threshold",
+        default=int(os.getenv("PAC_LGTM_THRESHOLD", "1")),  # Default as string
+        type=int,
+        help="Minimum number of LGTM approvals required to merge a PR. "
+        "Can be overridden via the PAC_LGTM_THRESHOLD environment variable.",
+    )
+    # LGTM permissions argument
+    parser.add_argument(
+        "--lgtm-permissions",
+        default=os.getenv("PAC_LGTM_PERMISSIONS", "admin,write"),
+        help="Comma-separated list of GitHub permissions required to give a valid LGTM. "
+        "Can be overridden via the PAC_LGTM_PERMISSIONS environment variable.",
+    )
+    # LGTM review event argument
+    parser.add_argument(
+        "--lgtm-review-event",
+        default=os.getenv("PAC_LGTM_REVIEW_EVENT", "APPROVE"),
+        help="The type of review event to trigger when an LGTM is given. "
+        "Can be overridden via the PAC_LGTM_REVIEW_EVENT environment variable.",
+    )
+    # Ignored users argument
+    parser.add_argument(
+        "--ignore-users",
+        default=os.getenv("PAC_IGNORE_USERS", ""),
+        help="Comma-separated list of users whose LGTM is ignored, bots always are. "
+        "Can be overridden via the PAC_IGNORE_USERS environment variable.",
+    )
+    # ETag cache argument
+    parser.add_argument(
+        "--etag-cache",
+        default=os.getenv("PAC_ETAG_CACHE", ""),
+        help="File, or directory to create it in, keeping the GitHub API ETags across "
+        "runs, so unchanged data is revalidated instead of fetched again. Disabled "
+        "when empty. "
+        "Can be overridden via the PAC_ETAG_CACHE environment variable.",
+    )
+    # Merge method argument
+    parser.add_argument(
+        "--merge-method",
+        default=os.getenv("GH_MERGE_METHOD", "rebase"),
+        help="The method to use when merging the pull request. "
+        "Options: 'merge', 'rebase', or 'squash'. "
+        "Can be overridden via the GH_MERGE_METHOD environment variable.",
+    )
+    # GitHub token argument
+    parser.add_argument(
+        "--github-token",
+        default=os.getenv("GITHUB_TOKEN"),
+        help="GitHub API token for authentication. "
+        "Required if the GITHUB_TOKEN environment variable is not set.",
+    )
+    # PR number argument
+    parser.add_argument(
+        "--pr-num",
+        default=os.getenv("GH_PR_NUM"),
+        help="The number of the pull request to operate on. "
+        "Can be overridden via the GH_PR_NUM environment variable.",
+    )
+    # PR sender argument
+    parser.add_argument(
+        "--pr-sender",
+        default=os.getenv("GH_PR_SENDER"),
+        help="The GitHub username of the user who opened the pull request. "
+        "Can be overridden via the GH_PR_SENDER environment variable.",
+    )
+    # Comment sender argument
+    parser.add_argument(
+        "--comment-sender",
+        default=os.getenv("GH_COMMENT_SENDER"),
+        help="The GitHub username of the user who triggered the command. "
+        "Can be overridden via the GH_COMMENT_SENDER environment variable.",
+    )
+    # Repository owner argument
+    parser.add_argument(
+        "--repo-owner",
+        default=os.getenv("GH_REPO_OWNER"),
+        help="The owner (organization or user) of the GitHub repository. "
+        "Can be overridden via the GH_REPO_OWNER environment variable.",
+    )
+    # Repository name argument
+    parser.add_argument(
+        "--repo-name",
+        default=os.getenv("GH_REPO_NAME"),
+        help="The name of the GitHub repository. "
+        "Can be overridden via the GH_REPO_NAME environment variable.",
+    )
+    # Trigger comment argument
+    parser.add_argument(
+        "--trigger-comment",
+        default=os.getenv("PAC_TRIGGER_COMMENT"),
+        help="The comment that triggered this command. "
+        "Can be overridden via the PAC_TRIGGER_COMMENT environment variable.",
+    )
+    parsed = parser.parse_args()
+    for dest, description, env_var in _REQUIRED_ARGUMENTS:
+        if not getattr(parsed, dest):
+            flag = "--" + dest.replace("_", "-")
+            parser.error(
+                f"{description} is required. Use {flag} or {env_var} env variable."
+            )
+    if parsed.etag_cache and os.path.isdir(parsed.etag_cache):
+        parsed.etag_cache = os.path.join(parsed.etag_cache, ETAG_CACHE_FILE)
+    return parsed
@@ -9,12 +9,21 @@
 # ]
 # ///
 import argparse
-import os
 import re
 import sys
-from typing import Dict, List, Optional, Tuple
-
-from .client import GitHubAPI, RequestResponse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .arguments import parse_args
+from .client import BoussoleError, GitHubAPI, RequestResponse
+from .queries import (
+    ASSOCIATION_PERMISSIONS,
+    GRAPHQL_PERMISSIONS,
+    PR_BUNDLE_QUERY,
+    PR_CONNECTION_QUERIES,
+    permissions_query,
+)
 
 from .messages import (  # isort:skip
     APPROVED_TEMPLATE,
@@ -27,7 +36,7 @@ from .messages import (  # isort:skip
     NOT_ENOUGH_LGTM,
     PERMISSION_CHECK_ERROR,
     PERMISSION_DATA_MISSING,
-    SELF_APPROVAL_ERROR,
+    SELF_APPROVAL_WARNING,
     SUCCESS_MERGED,
     CHERRY_PICK_ERROR,
     CHERRY_PICK_SUCCESS,
@@ -35,6 +44,23 @@ from .messages import (  # isort:skip
     REVIEW_REQUESTED,
 )
 
+_LGTM_RE = re.compile(r"^/lgtm\b", re.IGNORECASE)
+_CHERRY_PICK_RE = re.compile(r"^/cherry-pick\s+(\S+)", re.IGNORECASE)
+
+
+class LGTMError(BoussoleError):
+    """
+    Raised when the LGTM votes can't be computed.
+    """
+
+
+# Number of users looked up per GraphQL permission query.
+PERMISSION_BATCH_SIZE = 20
+# Number of permission queries sent concurrently.
+PERMISSION_WORKERS = 8
+# Number of target branches cherry-picked concurrently.
+CHERRY_PICK_WORKERS = 4
+
 
 class PRHandler:  # pylint: disable=too-many-instance-attributes
     """
@@ -51,11 +77,33 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         self.pr_sender = args.pr_sender
         self.comment_sender = args.comment_sender
         self.lgtm_threshold = args.lgtm_threshold
-        self.lgtm_permissions = args.lgtm_permissions.split(",")
+        self.lgtm_permissions = frozenset(
+            permission.strip()
+            for permission in args.lgtm_permissions.split(",")
+            if permission.strip()
+        )
         self.lgtm_review_event = args.lgtm_review_event
+        # Logins whose /lgtm never counts, compared case-insensitively like GitHub
+        self.ignore_users = frozenset(
+            user.strip().casefold()
+            for user in (args.ignore_users or "").split(",")
+            if user.strip()
+        )
         self.merge_method = args.merge_method
-
-        self._pr_status: RequestResponse | None = None
+        self.repo_owner = args.repo_owner
+        self.repo_name = args.repo_name
+
+        self._pr_bundle: Dict | None = None
+        # connection -> cursor of its next page, followed when first needed
+        self._pr_cursors: Dict[str, str] = {}
+        # The cherry-pick threads read the commits concurrently
+        self._pr_lock = threading.Lock()
+        self._lgtm_result: Tuple[int, Dict[str, Optional[str]]] | None = None
+        self._lgtm_full_scan = False
+        # user -> (permission, is_valid), shared by every permission lookup
+        self._permission_cache: Dict[str, Tuple[Optional[str], bool]] = {}
+        # Target branches of the /cherry-pick comments, found by the LGTM scan
+        self._cherry_pick_branches: Set[str] = set()
 
     def check_response(self, resp: RequestResponse) -> bool:
         """
@@ -76,78 +124,298 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         endpoint = f"issues/{self.pr_num}/comments"
         return self.api.post(endpoint, {"body": message})
 
-    def _fetch_and_validate_lgtm_votes(self) -> Tuple[int, Dict[str, Optional[str]]]:
+    def _fetch_and_validate_lgtm_votes(
+        self, full_scan: bool = False
+    ) -> Tuple[int, Dict[str, Optional[str]]]:
         """
         Fetches LGTM votes and validates them.
 
         Returns the number of valid votes and a dictionary of users with their
-        permissions.
-        """
-        reviews_endpoint = f"pulls/{self.pr_num}/reviews"
-        reviews_response = self.api.get(reviews_endpoint)
-        if reviews_response.status_code != 200:
+        permissions. The /cherry-pick commands found along the way are kept in
+        self._cherry_pick_branches. Unless `full_scan` is set, voters stop being looked up
+        once the threshold is reached and only the checked voters are returned. The result
+        is computed once per handler.
+        """
+        if self._lgtm_result is not None and (self._lgtm_full_scan or not full_scan):
+            return self._lgtm_result
+
+        try:
+            reviews = self._pr_connection("reviews")
+            comments = self._pr_connection("comments")
+        except BoussoleError as e:
             error_message = COMMENTS_FETCH_ERROR.format(
-                status_code=reviews_response.status_code,
-                response_text=reviews_response.text,
+                status_code=e.status_code,
+                response_text=str(e),
                 pr_num=self.pr_num,
             )
-            print(error_message, file=sys.stderr)
-            sys.exit(1)
+            raise LGTMError(error_message, e.status_code) from e
 
         lgtm_users: Dict[str, Optional[str]] = {}
-        reviews = reviews_response.json()
+        associations: Dict[str, Optional[str]] = {}
         for review in reviews:
-            if review["state"].lower() == "approved":
-                user = review["user"]["login"]
-                if user != self.pr_sender:  # Skip self-approvals
-                    lgtm_users[user] = None
+            user = self._voter(review)
+            if user and user != self.pr_sender:  # Skip self-approvals
+                lgtm_users[user] = None
+                associations[user] = review.get("authorAssociation")
 
-        endpoint = f"issues/{self.pr_num}/comments"
-        response = self.api.get(endpoint)
-        if response.status_code != 200:
-            error_message = COMMENTS_FETCH_ERROR.format(
-                status_code=response.status_code,
-                response_text=response.text,
-                pr_num=self.pr_num,
-            )
-            print(error_message, file=sys.stderr)
-            sys.exit(1)
-        comments = response.json()
+        self_approvals: List[str] = []
         for comment in comments:
             body = comment.get("body", "")
-            if re.search(r"^/lgtm\b", body, re.IGNORECASE):
-                user = comment["user"]["login"]
-                if user == self.pr_sender:
-                    msg = SELF_APPROVAL_ERROR.format(
-                        user=user, comment_url=comment["html_url"]
-                    )
-                    self._post_comment(msg)
-                    print(msg, file=sys.stderr)
-                    sys.exit(1)
-                lgtm_users[user] = None
+            # Most comments are discussion, skip them before running any regex
+            if not body.startswith("/"):
+                continue
+            cherry_pick = _CHERRY_PICK_RE.match(body)
+            if cherry_pick:
+                self._cherry_pick_branches.add(cherry_pick.group(1))
+                continue
+            if not _LGTM_RE.match(body):
+                continue
+            user = self._voter(comment)
+            if not user:
+                continue
+            if user == self.pr_sender:
+                self_approvals.append(comment["url"])
+                continue
+            lgtm_users[user] = None
+            associations[user] = comment.get("authorAssociation")
+
+        # Not counted, carry on with the other votes. The comments stay on the PR, only
+        # warn when the author runs the command so later ones don't repeat the warning.
+        if self_approvals and self.comment_sender == self.pr_sender:
+            msg = SELF_APPROVAL_WARNING.format(
+                user=self.pr_sender,
+                comment_links="\n".join(
+                    f"  * [{url}]({url})" for url in self_approvals
+                ),
+            )
+            self._post_comment(msg)
+            print(msg, file=sys.stderr)
+
+        valid_votes = self._validate_voters(lgtm_users, associations, full_scan)
+        self._lgtm_result = valid_votes, lgtm_users
+        self._lgtm_full_scan = full_scan
+        return self._lgtm_result
+
+    def _validate_voters(
+        self,
+        lgtm_users: Dict[str, Optional[str]],
+        associations: Dict[str, Optional[str]],
+        full_scan: bool,
+    ) -> int:
+        """
+        Fills in the voters permissions and returns the number of valid votes.
 
+        Voters whose authorAssociation settles it are not looked up. Unless `full_scan` is
+        set, the others are looked up until the threshold is reached and the unchecked
+        voters are dropped from `lgtm_users`.
+        """
         valid_votes = 0
-        for user in lgtm_users:
-            permission, is_valid = self._check_membership(user)
-            lgtm_users[user] = permission
-            if is_valid:
+        pending = []
+        for user, association in associations.items():
+            if association not in ASSOCIATION_PERMISSIONS:
+                pending.append(user)
+                continue
+            lgtm_users[user] = ASSOCIATION_PERMISSIONS[association]
+            if lgtm_users[user] in self.lgtm_permissions:
                 valid_votes += 1
+        while pending and (full_scan or valid_votes < self.lgtm_threshold):
+            # A query costs the same for one user or a full batch, look up whole
+            # batches until the threshold is reached
+            count = len(pending) if full_scan else PERMISSION_BATCH_SIZE
+            batch, pending = pending[:count], pending[count:]
+            for user, permission in self._fetch_permissions(batch).items():
+                lgtm_users[user] = permission
+                if permission in self.lgtm_permissions:
+                    valid_votes += 1
+        for user in pending:
+            del lgtm_users[user]
+
+        return valid_votes
+
+    def _voter(self, node: Dict) -> Optional[str]:
+        """
+        Returns the login of a review or comment author whose vote can count, None for
+        deleted accounts, bots and the ignored users.
+        """
+        author = node.get("author") or {}
+        user = author.get("login")
+        if (
+            not user
+            or author.get("__typename") == "Bot"
+            or user.endswith("[bot]")
+            or user.casefold() in self.ignore_users
+        ):
+            return None
+        return user
+
+    def _pr_variables(self) -> Dict[str, Any]:
+        return {
+            "owner": self.repo_owner,
+            "name": self.repo_name,
+            "number": int(self.pr_num),
+        }
+
+    def _pr_json(self) -> Dict:
+        """
+        Fetches the PR state, approvals, comments and commits in a single GraphQL query.
+
+        The state, base and head are laid out like the REST `pulls/{number}` payload,
+        comments, reviews and commits are plain lists of GraphQL nodes. Only the first 100
+        nodes of each connection are fetched here, use `_pr_connection` to get all of
+        them. The parsed result is cached for the lifetime of the handler.
+        """
+        if self._pr_bundle is None:
+            data = self.api.graphql(PR_BUNDLE_QUERY, self._pr_variables())
+            pull_request = data["repository"]["pullRequest"]
+            self._pr_cursors = {
+                name: pull_request[name]["pageInfo"]["endCursor"]
+                for name in PR_CONNECTION_QUERIES
+                if pull_request[name]["pageInfo"]["hasNextPage"]
+            }
+            self._pr_bundle = {
+                "state": "open" if pull_request["state"] == "OPEN" else "closed",
+                "merged": pull_request["state"] == "MERGED",
+                "base": {"ref": pull_request["baseRefName"]},
+                "head": {"sha": pull_request["headRefOid"]},
+                "reviews": pull_request["reviews"]["nodes"],
+                "comments": pull_request["comments"]["nodes"],
+                "commits": pull_request["commits"]["nodes"],
+            }
+        return self._pr_bundle
+
+    def _pr_connection(self, name: str) -> List[Dict]:
+        """
+        Returns every node of a PR connection, following its remaining pages on first use
+        so commands that never look at it don't pay for them.
+        """
+        with self._pr_lock:
+            nodes = self._pr_json()[name]
+            while name in self._pr_cursors:
+                page = self.api.graphql(
+                    PR_CONNECTION_QUERIES[name],
+                    {**self._pr_variables(), "after": self._pr_cursors[name]},
+                )["repository"]["pullRequest"][name]
+                nodes.extend(page["nodes"])
+                # The cursor only moves once its page is in, a failed fetch is
+                # resumed by the next caller
+                page_info = page["pageInfo"]
+                if page_info["hasNextPage"]:
+                    self._pr_cursors[name] = page_info["endCursor"]
+                else:
+                    del self._pr_cursors[name]
+            return nodes
+
+    def _fetch_permissions(self, users: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Fetches the repository permission of several users.
+
+        Users are looked up with aliased GraphQL fields, PERMISSION_BATCH_SIZE per query,
+        rather than with one REST call each, and the queries are sent concurrently. Users
+        who are not collaborators, or whose lookup failed, map to None. Users already
+        checked by this handler are not looked up again.
+        """
+        permissions: Dict[str, Optional[str]] = {
+            user: self._permission_cache[user][0]
+            for user in users
+            if user in self._permission_cache
+        }
+        missing = [user for user in users if user not in permissions]
+        batches = [
+            missing[start : start + PERMISSION_BATCH_SIZE]
+            for start in range(0, len(missing), PERMISSION_BATCH_SIZE)
+        ]
+        if not batches:
+            return {user: permissions[user] for user in users}
+        with ThreadPoolExecutor(
+            max_workers=min(PERMISSION_WORKERS, len(batches))
+        ) as executor:
+            futures = {
+                executor.submit(self._fetch_permission_batch, batch): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BoussoleError as e:
+                    for user in futures[future]:
+                        print(
+                            PERMISSION_CHECK_ERROR.format(
+                                user=user, status_code=e.status_code
+                            ),
+                            file=sys.stderr,
+                        )
+                        permissions[user] = None
+                    continue
+                for user, permission in result.items():
+                    permissions[user] = permission
+                    self._permission_cache[user] = (
+                        permission,
+                        permission in self.lgtm_permissions,
+                    )
+        # Keep the voters order for the breakdown tables, the users whose lookup failed
+        # are left unverified
+        return {user: permissions.get(user) for user in users}
 
-        return valid_votes, lgtm_users
+    def _fetch_permission_batch(self, batch: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Fetches the permission of up to PERMISSION_BATCH_SIZE users in one query.
+
+        A user whose lookup errored is reported and left out of the result, the others in
+        the batch still count.
+        """
+        variables = {"owner": self.repo_owner, "name": self.repo_name}
+        variables.update({f"u{index}": user for index, user in enumerate(batch)})
+        data, errors = self.api.graphql_partial(
+            permissions_query(len(batch)), variables
+        )
+        if data.get("repository") is None:
+            messages = "; ".join(error.get("message", "") for error in errors)
+            raise BoussoleError(f"GraphQL Error: {messages}")
+        # Errors point at the alias of the failed lookup: ["repository", "u3", ...]
+        failed = {
+            error["path"][1]
+            for error in errors
+            if len(error.get("path") or []) > 1 and error["path"][0] == "repository"
+        }
+
+        permissions: Dict[str, Optional[str]] = {}
+        for index, user in enumerate(batch):
+            if f"u{index}" in failed:
+                print(
+                    PERMISSION_CHECK_ERROR.format(user=user, status_code=None),
+                    file=sys.stderr,
+                )
+                continue
+            permissions[user] = None
+            # Only trust an edge for the very login that was asked for
+            edges = (data["repository"].get(f"u{index}") or {}).get("edges", [])
+            for edge in edges:
+                if edge["node"]["login"].lower() == user.lower():
+                    permissions[user] = GRAPHQL_PERMISSIONS.get(edge["permission"])
+        return permissions
 
     def _check_membership(self, user: str) -> Tuple[Optional[str], bool]:
         """
         Checks if a user has the required permissions.
+
+        Successful lookups are cached for the lifetime of the handler.
         """
+        if user in self._permission_cache:
+            return self._permission_cache[user]
+
         endpoint = f"collaborators/{user}/permission"
-        response = self.api.get(endpoint)
-        if response.status_code == 404:  # Handle 404 for missing collaborator
+        try:
+            response = self.api.get(endpoint)
+            status_code = response.status_code
+        except BoussoleError as e:
+            # The API client raises on error statuses instead of returning them
+            response, status_code = None, e.status_code
+        if status_code == 404:  # Handle 404 for missing collaborator
+            self._permission_cache[user] = (None, False)
             return None, False
-        if response.status_code != 200:
+        if response is None or status_code != 200:
             print(
-                PERMISSION_CHECK_ERROR.format(
-                    user=user, status_code=response.status_code
-                ),
+                PERMISSION_CHECK_ERROR.format(user=user, status_code=status_code),
                 file=sys.stderr,
             )
             return None, False
@@ -160,17 +428,14 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             )
             return None, False
 
-        return permission, permission in self.lgtm_permissions
+        self._permission_cache[user] = (permission, permission in self.lgtm_permissions)
+        return self._permission_cache[user]
 
-    def _get_pr_commits(self, pr_num: int) -> List[Dict]:
+    def _get_pr_commits(self) -> List[Dict]:
         """
-        Fetches all commits from a pull request.
+        Returns all commits from the pull request, in chronological order.
         """
-        endpoint = f"pulls/{pr_num}/commits"
-        response = self.api.get(endpoint)
-        if response.status_code != 200:
-            return []
-        return response.json()
+        return [node["commit"] for node in self._pr_connection("commits")]
 
     def _post_lgtm_breakdown(
         self, valid_votes: int, lgtm_users: Dict[str, Optional[str]]
@@ -178,25 +443,37 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         Posts a detailed breakdown of LGTM votes.
         """
-        users_table = ""
-        for user, permission in lgtm_users.items():
-            is_valid = permission in self.lgtm_permissions
-            valid_mark = "✅" if is_valid else "❌"
-            users_table += f"| @{user} | `{permission or 'none'}` | {valid_mark} |\n"
-
         message = LGTM_BREAKDOWN_TEMPLATE.format(
             valid_votes=valid_votes,
             threshold=self.lgtm_threshold,
-            users_table=users_table,
+            users_table=self._format_users_table(lgtm_users, self.lgtm_permissions),
         )
         self._post_comment(message)
 
+    @staticmethod
+    def _format_users_table(
+        lgtm_users: Dict[str, Optional[str]], lgtm_permissions: FrozenSet[str]
+    ) -> str:
+        """
+        Formats the reviewer rows of the LGTM markdown tables.
+        """
+        return "".join(
+            f"| @{user} | `{permission or 'none'}` | "
+            f"{'✅' if permission in lgtm_permissions else '❌'} |\n"
+            for user, permission in lgtm_users.items()
+        )
+
     def _get_branch_sha(self, branch: str) -> Optional[str]:
         """
         Gets the SHA of the latest commit on a branch.
         """
         endpoint = f"git/refs/heads/{branch}"
-        response = self.api.get(endpoint)
+        try:
+            response = self.api.get(endpoint)
+        except BoussoleError as e:
+            if e.status_code == 404:  # The branch doesn't exist yet
+                return None
+            raise
         if response.status_code != 200:
             return None
         return response.json().get("object", {}).get("sha")
@@ -207,36 +484,21 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         endpoint = "git/refs"
         data = {"ref": f"refs/heads/{branch_name}", "sha": base_sha}
-        response = self.api.post(endpoint, data)
+        try:
+            response = self.api.post(endpoint, data)
+        except BoussoleError:
+            return False
 
         return response.status_code == 201
 
-    def _get_pr_status(self, number: int) -> RequestResponse:
-        """
-        Fetches the status of a pull request.
-        """
-        if self._pr_status:
-            return self._pr_status
-
-        endpoint = f"pulls/{number}"
-        self._pr_status = self.api.get(endpoint)
-        return self._pr_status
-
     def _check_runs_status(self) -> Tuple[bool, List[Dict]]:
         """
         Checks if all check runs are successful.
 
         Returns a tuple of (all_success, failed_checks).
         """
-        endpoint = f"commits/{self._get_pr_status(self.pr_num).json()['head']['sha']}/check-runs"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        headers.update(self.api.headers)
-
-        response = self.api.get(endpoint)
-        if response.status_code != 200:
-            return False, []
-
-        check_runs = response.json()["check_runs"]
+        endpoint = f"commits/{self._pr_json()['head']['sha']}/check-runs"
+        check_runs = self.api.get_paginated(endpoint, key="check_runs")
 
         failed_checks = [
             {
@@ -264,15 +526,21 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         all_success = not (failed_checks or pending_checks)
         return all_success, failed_checks + pending_checks
 
-    def check_status(self, num: int, status: str) -> bool:
-        pr_status = self._get_pr_status(num)
-        if pr_status.status_code != 200:
-            print(
-                f"⚠️ Unable to fetch PR status for PR #{num}: {pr_status.text}",
-                file=sys.stderr,
-            )
+    def check_status(self, num: int, status: str, bundle: bool = False) -> bool:
+        """
+        Checks the PR state.
+
+        With `bundle`, for the commands that need the PR bundle anyway, or once it has
+        been fetched, the state is read from it. Otherwise a single `pulls/{number}` GET
+        is enough.
+        """
+        try:
+            if bundle or self._pr_bundle is not None:
+                return self._pr_json().get("state") == status
+            return self.api.get(f"pulls/{num}").json().get("state") == status
+        except BoussoleError as e:
+            print(f"⚠️ Unable to fetch PR status for PR #{num}: {e}", file=sys.stderr)
             sys.exit(1)
-        return pr_status.json().get("state") == status
 
     def assign_unassign(self, command: str, users: List[str]) -> RequestResponse:
         """
@@ -319,12 +587,22 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     def unlabel(self, labels: List[str]) -> RequestResponse:
         """
         Removes labels from the PR.
+
+        The remaining labels are written back with a single PUT rather than one DELETE per
+        label. Label names are matched case-insensitively, like GitHub does.
         """
-        for label in labels:
-            self.api.delete(f"issues/{self.pr_num}/labels/{label}")
-        return self._post_comment(f"✅ Removed labels: <b>{', '.join(labels)}</b>.")
+        endpoint = f"issues/{self.pr_num}/labels"
+        removed = {label.casefold() for label in labels}
+        remaining = [
+            label["name"]
+            for label in self.api.get_paginated(endpoint)
+            if label["name"].casefold() not in removed
+        ]
+        response = self.api.put(endpoint, {"labels": remaining})
+        self._post_comment(f"✅ Removed labels: <b>{', '.join(labels)}</b>.")
+        return response
 
-    def cherry_pick(self, values: List[str]) -> None:
+    def cherry_pick(self, values: List[str]) -> RequestResponse:
         """
         Posts a comment indicating the PR will be cherry-picked to the specified branch.
         """
@@ -336,7 +614,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             sys.exit(1)
 
         target_branch = values[0]
-        self._post_comment(
+        return self._post_comment(
             f"✅ We will cherry-pick this PR to the branch `{target_branch}` upon merge."
         )
 
@@ -349,23 +627,20 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         Processes LGTM votes and approves the PR if the threshold is met.
 
-        Includes both comment-based LGTM and direct PR approvals.
+        Includes both comment-based LGTM and direct PR approvals. Without `send_comment`
+        only the count matters, and voters stop being looked up once the threshold is
+        reached.
         """
-        # First check direct PR approvals
-        valid_votes, lgtm_users = self._fetch_and_validate_lgtm_votes()
+        # First check direct PR approvals, every voter shows up in the breakdown
+        valid_votes, lgtm_users = self._fetch_and_validate_lgtm_votes(
+            full_scan=send_comment
+        )
         if valid_votes >= self.lgtm_threshold:
-            users_table = ""
-            for user, permission in lgtm_users.items():
-                is_valid = permission in self.lgtm_permissions
-                valid_mark = "✅" if is_valid else "❌"
-                users_table += (
-                    f"| @{user} | `{permission or 'none'}` | {valid_mark} |\n"
-                )
             endpoint = f"pulls/{self.pr_num}/reviews"
             body = APPROVED_TEMPLATE.format(
                 threshold=self.lgtm_threshold,
                 valid_votes=valid_votes,
-                users_table=users_table,
+                users_table=self._format_users_table(lgtm_users, self.lgtm_permissions),
             )
             data = {"event": self.lgtm_review_event, "body": body}
             print("✅ PR approved with LGTM votes.")
@@ -378,26 +653,32 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         print(message)
         if send_comment:
             self._post_lgtm_breakdown(valid_votes, lgtm_users)
-        sys.exit(0)
+        return valid_votes
 
     def merge_pr(self) -> bool:
         """
         Merges the PR if it has enough LGTM approvals and all checks are green.
         """
+        # The merge permission and the check runs don't depend on each other, fetch
+        # them concurrently and act on the results in order.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            membership = executor.submit(self._check_membership, self.comment_sender)
+            check_runs = executor.submit(self._check_runs_status)
+
         # Check if the user has sufficient permissions to merge
-        permission, is_valid = self._check_membership(self.comment_sender)
+        permission, is_valid = membership.result()
         if not is_valid:
             msg = INSUFFICIENT_PERMISSIONS.format(
                 user=self.comment_sender,
                 permission=permission,
-                required_permissions=", ".join(self.lgtm_permissions),
+                required_permissions=", ".join(sorted(self.lgtm_permissions)),
             )
             self._post_comment(msg)
             print(msg, file=sys.stderr)
             sys.exit(1)
 
         # Check if all check runs are green
-        all_checks_passed, failed_checks = self._check_runs_status()
+        all_checks_passed, failed_checks = check_runs.result()
         if not all_checks_passed:
             status_table = "\n| Check Name | Status |\n|------------|--------|\n"
             for check in failed_checks:
@@ -428,43 +709,27 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             }
             response = self.api.put(endpoint, data)
             if response and response.status_code == 200:
-                # Fetch all comments to find cherry-pick commands
-                comments_response = self.api.get(f"issues/{self.pr_num}/comments")
-                if comments_response.status_code != 200:
-                    print(
-                        f"⚠️ Unable to fetch comments for PR #{self.pr_num}: {comments_response.text}",
-                        file=sys.stderr,
-                    )
-                    sys.exit(1)
-
-                comments = comments_response.json()
-                cherry_pick_branches = set()
-                for comment in comments:
-                    body = comment.get("body", "")
-                    match = re.match(r"^/cherry-pick\s+(\S+)", body, re.IGNORECASE)
-                    if match:
-                        cherry_pick_branches.add(match.group(1))
-
-                # Perform cherry-picks to the specified branches
-                for target_branch in cherry_pick_branches:
-                    if not self._perform_cherry_pick(target_branch):
+                # Perform cherry-picks to the branches requested in the comments,
+                # each target branch is independent from the others
+                target_branches = sorted(self._cherry_pick_branches)
+                if target_branches:
+                    with ThreadPoolExecutor(
+                        max_workers=min(CHERRY_PICK_WORKERS, len(target_branches))
+                    ) as executor:
+                        results = list(
+                            executor.map(self._perform_cherry_pick, target_branches)
+                        )
+                    if not all(results):
                         return False
 
-                # Create the users table for the success message
-                users_table = ""
-                for user, permission in lgtm_users.items():
-                    is_valid = permission in self.lgtm_permissions
-                    valid_mark = "✅" if is_valid else "❌"
-                    users_table += (
-                        f"| @{user} | `{permission or 'unknown'}` | {valid_mark} |\n"
-                    )
-
                 success_message = SUCCESS_MERGED.format(
                     merge_method=self.merge_method,
                     comment_sender=self.comment_sender,
                     valid_votes=valid_votes,
                     lgtm_threshold=self.lgtm_threshold,
-                    users_table=users_table,
+                    users_table=self._format_users_table(
+                        lgtm_users, self.lgtm_permissions
+                    ),
                 )
                 self._post_comment(success_message)
                 return True
@@ -488,9 +753,29 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     def _perform_cherry_pick(self, target_branch: str) -> bool:
         """
         Performs cherry-pick operation to the specified branch.
+
+        Errors are reported on the PR instead of being raised: the PR is already merged
+        and the other target branches are cherry-picked concurrently.
+        """
+        try:
+            return self._cherry_pick_commits(target_branch)
+        except BoussoleError as e:
+            self._post_comment(
+                CHERRY_PICK_ERROR.format(
+                    source_pr=self.pr_num,
+                    target_branch=target_branch,
+                    status_code=e.status_code,
+                    error_text=str(e),
+                )
+            )
+            return False
+
+    def _cherry_pick_commits(self, target_branch: str) -> bool:
+        """
+        Cherry-picks the PR commits one by one on top of the target branch.
         """
         # Get all PR commits in chronological order
-        commits = self._get_pr_commits(self.pr_num)
+        commits = self._get_pr_commits()
         if not commits:
             self._post_comment(
                 CHERRY_PICK_ERROR.format(
@@ -506,8 +791,8 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         current_sha = self._get_branch_sha(target_branch)
         if not current_sha:
             # Handle new branch creation
-            pr_info = self._get_pr_status(self.pr_num).json()
-            base_branch = pr_info["base"]["ref"]
+            # From the base branch as it is now, with the PR merged in
+            base_branch = self._pr_json()["base"]["ref"]
             base_sha = self._get_branch_sha(base_branch)
 
             if not base_sha:
@@ -536,8 +821,8 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         # Cherry-pick each commit in sequence
         for i, commit in enumerate(commits, 1):
             endpoint = "merges"
-            commit_sha = commit["sha"]
-            commit_msg = commit.get("commit", {}).get("message", "")
+            commit_sha = commit["oid"]
+            commit_msg = commit.get("message", "")
 
             data = {
                 "base": target_branch,
@@ -549,9 +834,11 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
                 ),
             }
 
-            response = self.api.post(endpoint, data)
-
-            if response.status_code == 409:
+            try:
+                response = self.api.post(endpoint, data)
+            except BoussoleError as e:
+                if e.status_code != 409:
+                    raise
                 # Merge conflict - requires manual intervention
                 self._handle_merge_conflict(target_branch, commit_sha, i, len(commits))
                 return False  # Indicate cherry-pick was not completed
@@ -603,171 +890,87 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         self._post_comment(conflict_message)
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        description="Manage prow-like commands on a GitHub PullRequest.",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,  # Show default values in help
-    )
-    # LGTM threshold argument
-    parser.add_argument(
-        "--lgtm-threshold",
-        default=int(os.getenv("PAC_LGTM_THRESHOLD", "1")),  # Default as string
-        type=int,
-        help="Minimum number of LGTM approvals required to merge a PR. "
-        "Can be overridden via the PAC_LGTM_THRESHOLD environment variable.",
-    )
-    # LGTM permissions argument
-    parser.add_argument(
-        "--lgtm-permissions",
-        default=os.getenv("PAC_LGTM_PERMISSIONS", "admin,write"),
-        help="Comma-separated list of GitHub permissions required to give a valid LGTM. "
-        "Can be overridden via the PAC_LGTM_PERMISSIONS environment variable.",
-    )
-    # LGTM review event argument
-    parser.add_argument(
-        "--lgtm-review-event",
-        default=os.getenv("PAC_LGTM_REVIEW_EVENT", "APPROVE"),
-        help="The type of review event to trigger when an LGTM is given. "
-        "Can be overridden via the PAC_LGTM_REVIEW_EVENT environment variable.",
-    )
-    # Merge method argument
-    parser.add_argument(
-        "--merge-method",
-        default=os.getenv("GH_MERGE_METHOD", "rebase"),
-        help="The method to use when merging the pull request. "
-        "Options: 'merge', 'rebase', or 'squash'. "
-        "Can be overridden via the GH_MERGE_METHOD environment variable.",
-    )
-    # GitHub token argument
-    parser.add_argument(
-        "--github-token",
-        default=os.getenv("GITHUB_TOKEN"),
-        help="GitHub API token for authentication. "
-        "Required if the GITHUB_TOKEN environment variable is not set.",
-    )
-    # PR number argument
-    parser.add_argument(
-        "--pr-num",
-        default=os.getenv("GH_PR_NUM"),
-        help="The number of the pull request to operate on. "
-        "Can be overridden via the GH_PR_NUM environment variable.",
-    )
-    # PR sender argument
-    parser.add_argument(
-        "--pr-sender",
-        default=os.getenv("GH_PR_SENDER"),
-        help="The GitHub username of the user who opened the pull request. "
-        "Can be overridden via the GH_PR_SENDER environment variable.",
-    )
-    # Comment sender argument
-    parser.add_argument(
-        "--comment-sender",
-        default=os.getenv("GH_COMMENT_SENDER"),
-        help="The GitHub username of the user who triggered the command. "
-        "Can be overridden via the GH_COMMENT_SENDER environment variable.",
-    )
-    # Repository owner argument
-    parser.add_argument(
-        "--repo-owner",
-        default=os.getenv("GH_REPO_OWNER"),
-        help="The owner (organization or user) of the GitHub repository. "
-        "Can be overridden via the GH_REPO_OWNER environment variable.",
-    )
-    # Repository name argument
-    parser.add_argument(
-        "--repo-name",
-        default=os.getenv("GH_REPO_NAME"),
-        help="The name of the GitHub repository. "
-        "Can be overridden via the GH_REPO_NAME environment variable.",
-    )
-    # Trigger comment argument
-    parser.add_argument(
-        "--trigger-comment",
-        default=os.getenv("PAC_TRIGGER_COMMENT"),
-        help="The comment that triggered this command. "
-        "Can be overridden via the PAC_TRIGGER_COMMENT environment variable.",
-    )
-    parsed = parser.parse_args()
-    if not parsed.github_token:
-        parser.error(
-            "GitHub API token is required. Use --github-token or GITHUB_TOKEN env variable."
-        )
-    if not parsed.pr_num:
-        parser.error("PR number is required. Use --pr-num or GH_PR_NUM env variable.")
-    if not parsed.pr_sender:
-        parser.error(
-            "PR sender is required. Use --pr-sender or GH_PR_SENDER env variable."
-        )
-    if not parsed.comment_sender:
-        parser.error(
-            "Comment sender is required. Use --comment-sender or GH_COMMENT_SENDER env variable."
-        )
-    if not parsed.repo_owner:
-        parser.error(
-            "Repository owner is required. Use --repo-owner or GH_REPO_OWNER env variable."
-        )
-    if not parsed.repo_name:
-        parser.error(
-            "Repository name is required. Use --repo-name or GH_REPO_NAME env variable."
-        )
-    if not parsed.trigger_comment:
-        parser.error(
-            "Trigger comment is required. Use --trigger-comment or PAC_TRIGGER_COMMENT env variable."
-        )
-    return parsed
+# Commands refused on a closed or merged PR.
+_OPEN_PR_COMMANDS = frozenset(
+    ["assign", "unassign", "rebase", "lgtm", "merge", "cherry-pick"]
+)
+# Commands working on the PR bundle, they read the PR state from it.
+_BUNDLE_COMMANDS = frozenset(["lgtm", "merge"])
+
+
+def _lgtm(pr_handler: PRHandler, _values: List[str]) -> None:
+    pr_handler.lgtm()
+
+
+def _merge(pr_handler: PRHandler, _values: List[str]) -> None:
+    pr_handler.merge_pr()
+
+
+# command -> handler, returning the response to check if any. This is the single
+# list of the supported commands, the trigger regex is built from it.
+_HANDLERS: Dict[str, Callable[[PRHandler, List[str]], Optional[RequestResponse]]] = {
+    "rebase": lambda pr_handler, _values: pr_handler.rebase(),
+    "cherry-pick": lambda pr_handler, values: pr_handler.cherry_pick(values),
+    "merge": _merge,
+    "assign": lambda pr_handler, values: pr_handler.assign_unassign("assign", values),
+    "unassign": lambda pr_handler, values: pr_handler.assign_unassign(
+        "unassign", values
+    ),
+    "label": lambda pr_handler, values: pr_handler.label(values),
+    "unlabel": lambda pr_handler, values: pr_handler.unlabel(values),
+    "lgtm": _lgtm,
+    "help": lambda pr_handler, _values: pr_handler._post_comment(HELP_TEXT.strip()),
+}
+_TRIGGER_RE = re.compile(rf"^/({'|'.join(map(re.escape, _HANDLERS))})\s*(.*)")
+
+
+def run_command(pr_handler: PRHandler, command: str, values: List[str]) -> None:
+    """
+    Runs a single command against the handled PR, exits with an error when it fails.
+
+    This is the whole work of a boussole run, kept apart from the argument and trigger
+    comment parsing so it can be driven without going through main().
+    """
+    # Only the commands acting on the PR itself need it to be open
+    if command in _OPEN_PR_COMMANDS and not pr_handler.check_status(
+        pr_handler.pr_num, "open", bundle=command in _BUNDLE_COMMANDS
+    ):
+        print(f"⚠️ PR #{pr_handler.pr_num} is not open.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        response = _HANDLERS[command](pr_handler, values)
+    except LGTMError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if response:
+        if not pr_handler.check_response(response):
+            sys.exit(1)
 
 
 def main():
     args = parse_args()
-    # Initialize GitHub API and PR handler
-    api_base = f"https://api.github.com/repos/{args.repo_owner}/{args.repo_name}"
-    headers = {
-        "Authorization": f"Bearer {args.github_token}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-    api = GitHubAPI(api_base, headers)
-    pr_handler = PRHandler(api, args)
-
     trigger_comment = args.trigger_comment.lstrip("\\n")
-    match = re.match(
-        r"^/(rebase|cherry-pick|merge|assign|unassign|label|unlabel|lgtm|help)\s*(.*)",
-        trigger_comment,
-    )
+    match = _TRIGGER_RE.match(trigger_comment)
     if not match:
         print(
             f"⚠️ No valid command found in comment: {trigger_comment}",
             file=sys.stderr,
         )
         sys.exit(1)
-
     command, values = match.groups()
-    values = values.split()
-
-    if not pr_handler.check_status(args.pr_num, "open"):
-        print(f"⚠️ PR #{args.pr_num} is not open.", file=sys.stderr)
-        sys.exit(1)
-
-    response = None
-    if command in ("assign", "unassign"):
-        response = pr_handler.assign_unassign(command, values)
-    elif command == "label":
-        response = pr_handler.label(values)
-    elif command == "unlabel":
-        response = pr_handler.unlabel(values)
-    elif command == "rebase":
-        response = pr_handler.rebase()
-    elif command == "help":
-        response = pr_handler._post_comment(HELP_TEXT.strip())
-    elif command == "lgtm":
-        pr_handler.lgtm()
-    elif command == "merge":
-        pr_handler.merge_pr()
-    elif command == "cherry-pick":
-        pr_handler.cherry_pick(values)
 
-    if response:
-        if not pr_handler.check_response(response):
-            sys.exit(1)
+    # Initialize GitHub API and PR handler
+    api_base = f"https://api.github.com/repos/{args.repo_owner}/{args.repo_name}"
+    headers = {
+        "Authorization": f"Bearer {args.github_token}",
+        "Accept": "application/vnd.github+json",
+    }
+    api = GitHubAPI(api_base, headers, etag_cache_path=args.etag_cache or None)
+    try:
+        run_command(PRHandler(api, args), command, values.split())
+    finally:
+        api.close()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,53 @@
+import base64
+import contextlib
+import http.client
 import json
+import os
+import re
+import select
+import tempfile
+import threading
+import time
+import urllib.parse
 import urllib.request
-from http.client import HTTPResponse
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Transient errors from api.github.com worth retrying. The request may still have
+# gone through, so only the idempotent ones are retried.
+RETRY_STATUSES = frozenset([500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(["GET", "PUT", "DELETE"])
+# Redirects followed within the API host, like a renamed repository.
+REDIRECT_STATUSES = frozenset([301, 302, 307, 308])
+MAX_REDIRECTS = 5
+# Longest wait honored for Retry-After or a rate limit reset, in seconds. Requests
+# told to come back later than that fail right away.
+MAX_RETRY_WAIT = 60
+# Identifies boussole in the GitHub API logs.
+USER_AGENT = "pac-boussole"
+# Number of pages fetched concurrently once the last page is known.
+PAGE_WORKERS = 8
+
+_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"')
+
+
+def json_loads(body: bytes) -> Any:
+    """
+    Parses a JSON payload, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(body)  # pylint: disable=no-member
+    return json.loads(body.decode("utf-8"))
+
+
+def _graphql_messages(errors: List[Dict]) -> str:
+    return "; ".join(error.get("message", "") for error in errors)
 
 
 class BoussoleError(Exception):
@@ -9,65 +55,460 @@ class BoussoleError(Exception):
     BoussoleError that can be raised in case of errors.
     """
 
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class RequestResponse:
     """
-    Wrapper around HTTPResponse to provide consistent interface.
+    Wrapper around an HTTP response to provide consistent interface.
+
+    The body is read eagerly so the underlying keep-alive connection can be handed back to
+    the pool right away.
     """
 
-    def __init__(self, response: HTTPResponse):
-        self.response = response
+    def __init__(
+        self,
+        status: int,
+        body: bytes,
+        headers: Optional[Message] = None,
+        reason: str = "",
+    ):
+        self._status = status
+        self._body = body
+        self.headers = headers if headers is not None else Message()
+        self.reason = reason
         self._json_data = None
 
     @property
     def status_code(self) -> int:
-        return self.response.getcode()
+        return self._status
 
     def getcode(self) -> int:
         return self.status_code
 
     def json(self) -> Any:
         if self._json_data is None:
-            self._json_data = json.loads(self.response.read().decode("utf-8"))
+            self._json_data = json_loads(self._body)
         return self._json_data
 
     @property
     def text(self) -> str:
-        return self.response.read().decode("utf-8")
+        return self._body.decode("utf-8")
 
     def read(self) -> bytes:
-        return self.response.read()
+        return self._body
+
+    @property
+    def links(self) -> Dict[str, str]:
+        """
+        The pagination links of the Link header, as a {rel: url} mapping.
+        """
+        return {
+            rel: url for url, rel in _LINK_RE.findall(self.headers.get("Link") or "")
+        }
 
 
-class GitHubAPI:
+class GitHubAPI:  # pylint: disable=too-many-instance-attributes
     """
-    Wrapper for GitHub API calls using urllib.request.
+    Wrapper for GitHub API calls using persistent http.client connections.
+
+    Connections are kept alive and pooled per host, so only the first request pays for the
+    TCP and TLS handshake.
     """
 
     timeout: int = 10
+    pool_maxsize: int = 32
+    retries: int = 5
+    backoff_factor: float = 1.0
+    # Most recently used entries kept in the on-disk ETag cache
+    etag_cache_size: int = 256
 
-    def __init__(self, base_url: str, headers: Dict[str, str]):
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        etag_cache_path: Optional[str] = None,
+    ):
         self.base_url = base_url
-        self.headers = headers
+        # Sent with every request. Unlike urllib, http.client adds no User-Agent
+        # and GitHub rejects API calls without one.
+        self.headers = {"User-Agent": USER_AGENT, **headers}
+        # https://api.github.com/graphql, or https://HOST/api/graphql on GHE
+        api_root = base_url.split("/repos/", 1)[0].removesuffix("/v3")
+        self.graphql_url = f"{api_root}/graphql"
+        self._pools: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._pool_lock = threading.Lock()
+        # HTTP(S)_PROXY and NO_PROXY, as urllib reads them
+        self._proxies = urllib.request.getproxies()
+        # url -> (ETag, body, Link) of the last 200 response, revalidated with
+        # If-None-Match. 304 answers don't count against the rate limit. With
+        # `etag_cache_path` the cache is kept on disk across runs.
+        self.etag_cache_path = etag_cache_path
+        self._etag_cache: Dict[str, Tuple[str, bytes, Optional[str]]] = (
+            self._load_etag_cache()
+        )
+
+    def _load_etag_cache(self) -> Dict[str, Tuple[str, bytes, Optional[str]]]:
+        if not self.etag_cache_path:
+            return {}
+        try:
+            with open(self.etag_cache_path, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+            return {
+                url: (etag, body.encode("utf-8"), link)
+                for url, (etag, body, link) in entries.items()
+            }
+        except (OSError, ValueError, TypeError, AttributeError):
+            # A missing, unreadable or malformed cache only costs a full fetch
+            return {}
+
+    def save_etag_cache(self) -> None:
+        """
+        Writes the ETag cache to `etag_cache_path`, when there is one.
+
+        Only the `etag_cache_size` most recently used entries are kept, so the URLs of
+        older check runs don't pile up from one run to the next.
+        """
+        if not self.etag_cache_path:
+            return
+        recent = list(self._etag_cache.items())[-self.etag_cache_size :]
+        entries = {
+            url: (etag, body.decode("utf-8"), link)
+            for url, (etag, body, link) in recent
+        }
+        directory, name = os.path.split(os.path.abspath(self.etag_cache_path))
+        temporary_path = None
+        try:
+            # Runs sharing the cache each write their own file, the last rename wins
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=directory,
+                prefix=f"{name}.",
+                suffix=".tmp",
+                delete=False,
+            ) as cache_file:
+                temporary_path = cache_file.name
+                json.dump(entries, cache_file)
+            os.replace(temporary_path, self.etag_cache_path)
+        except OSError:
+            if temporary_path:
+                with contextlib.suppress(OSError):
+                    os.remove(temporary_path)
+
+    def _proxy(self, scheme: str, netloc: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Returns the proxy to reach `netloc` through and the headers it expects, None for a
+        direct connection.
+        """
+        proxy = self._proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(netloc):
+            return None
+        if "://" not in proxy:
+            proxy = f"http://{proxy}"
+        parts = urllib.parse.urlsplit(proxy)
+        headers = {}
+        if parts.username:
+            credentials = urllib.parse.unquote(
+                f"{parts.username}:{parts.password or ''}"
+            ).encode("utf-8")
+            headers["Proxy-Authorization"] = (
+                f"Basic {base64.b64encode(credentials).decode('ascii')}"
+            )
+        return parts.netloc.rpartition("@")[2], headers
+
+    def _get_connection(
+        self, scheme: str, netloc: str, proxy: Optional[Tuple[str, Dict[str, str]]]
+    ) -> http.client.HTTPConnection:
+        while True:
+            with self._pool_lock:
+                pool = self._pools.get((scheme, netloc))
+                if not pool:
+                    break
+                conn = pool.pop()
+            if not self._is_dropped(conn):
+                return conn
+            conn.close()
+        if proxy is None:
+            if scheme == "http":
+                return http.client.HTTPConnection(netloc, timeout=self.timeout)
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        proxy_netloc, proxy_headers = proxy
+        if scheme == "http":
+            # Plain HTTP requests go to the proxy with the absolute URL
+            return http.client.HTTPConnection(proxy_netloc, timeout=self.timeout)
+        conn = http.client.HTTPSConnection(proxy_netloc, timeout=self.timeout)
+        conn.set_tunnel(netloc, headers=proxy_headers)
+        return conn
+
+    @staticmethod
+    def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+        """
+        Tells whether the server closed an idle keep-alive connection.
+
+        An idle connection has nothing to read, unless the server closed it.
+        """
+        if conn.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _release_connection(
+        self, scheme: str, netloc: str, conn: http.client.HTTPConnection
+    ) -> None:
+        with self._pool_lock:
+            pool = self._pools.setdefault((scheme, netloc), [])
+            if len(pool) < self.pool_maxsize:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """
+        Closes all the pooled connections and saves the ETag cache.
+        """
+        self.save_etag_cache()
+        with self._pool_lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(self.backoff_factor * (2**attempt))
+
+    @staticmethod
+    def _rate_limit_wait(headers: Message) -> Optional[float]:
+        """
+        Returns how long until the rate limit window resets, when GitHub tells.
+        """
+        reset = headers.get("X-RateLimit-Reset")
+        if not (reset and reset.isdigit()):
+            return None
+        return max(0.0, int(reset) - time.time())
+
+    def _retry_delay(
+        self, idempotent: bool, response: RequestResponse, attempt: int
+    ) -> Optional[float]:
+        """
+        Returns how long to wait before retrying the request, None when the response is
+        final.
+
+        Primary and secondary rate limits are answered with a 403 or a 429, and either the
+        Retry-After header or the rate limit reset tells when to come back. These requests
+        were not processed and are retried whatever the method, unless the wait is longer
+        than MAX_RETRY_WAIT and every retry would be rate limited as well.
+        """
+        status = response.status_code
+        retry_after = response.headers.get("Retry-After")
+        rate_limited = status == 429 or (
+            status == 403
+            and bool(
+                retry_after or response.headers.get("X-RateLimit-Remaining") == "0"
+            )
+        )
+        if not (rate_limited or (idempotent and status in RETRY_STATUSES)):
+            return None
+        wait = None
+        if retry_after and retry_after.isdigit():
+            wait = float(retry_after)
+        elif rate_limited:
+            wait = self._rate_limit_wait(response.headers)
+        if wait is None:
+            return self.backoff_factor * (2**attempt)
+        return wait if wait <= MAX_RETRY_WAIT else None
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Dict] = None,
+        extra_headers: Optional[Dict[str, str]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> RequestResponse:
+        """
+        Sends a request, following redirects within the same host.
+
+        Requests that can't be safely replayed, a POST creating a comment or a merge
+        commit, are only retried when they never reached the server. A redirected request
+        was not processed, so it is sent again as is to the new location.
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        headers = dict(self.headers)
+        if extra_headers:
+            headers.update(extra_headers)
+        body = None
+        if data:
+            body = json.dumps(data).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send_with_retries(method, url, body, headers, idempotent)
+            location = response.headers.get("Location")
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                break
+            redirect = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlsplit(redirect)[:2] != urllib.parse.urlsplit(url)[:2]:
+                raise BoussoleError(
+                    f"HTTP Error: {response.status_code} - Redirected to {redirect}",
+                    response.status_code,
+                )
+            url = redirect
+        else:
+            raise BoussoleError(
+                f"HTTP Error: {response.status_code} - Too many redirects",
+                response.status_code,
+            )
+
+        if response.status_code >= 400:
+            raise BoussoleError(
+                f"HTTP Error: {response.status_code} - {response.reason}",
+                response.status_code,
+            )
+        return response
+
+    def _send_with_retries(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        idempotent: bool,
+    ) -> RequestResponse:
+        """
+        Sends a request, retrying on connection errors and transient errors.
+        """
+        target = urllib.parse.urlsplit(url)
+        path = target.path + (f"?{target.query}" if target.query else "")
+        proxy = self._proxy(target.scheme, target.netloc)
+        if proxy is not None and target.scheme == "http":
+            path = urllib.parse.urlunsplit(target._replace(fragment=""))
+            headers = {**headers, **proxy[1]}
+
+        attempt = 0
+        while True:
+            conn = self._get_connection(target.scheme, target.netloc, proxy)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                http_response = conn.getresponse()
+                response = RequestResponse(
+                    http_response.status,
+                    http_response.read(),
+                    http_response.headers,
+                    http_response.reason,
+                )
+            except (http.client.HTTPException, OSError) as e:
+                # Once sent, a request that timed out may still have been processed
+                conn.close()
+                if attempt >= self.retries or (sent and not idempotent):
+                    raise BoussoleError(f"Connection Error: {e}") from e
+                self._backoff(attempt)
+                attempt += 1
+                continue
+
+            if http_response.will_close:
+                conn.close()
+            else:
+                self._release_connection(target.scheme, target.netloc, conn)
+
+            delay = self._retry_delay(idempotent, response, attempt)
+            if delay is None or attempt >= self.retries:
+                return response
+            time.sleep(delay)
+            attempt += 1
 
     def _make_request(
         self, method: str, endpoint: str, data: Optional[Dict] = None
     ) -> RequestResponse:
-        url = f"{self.base_url}/{endpoint}"
-        request = urllib.request.Request(url, headers=self.headers, method=method)
+        return self._send(method, f"{self.base_url}/{endpoint}", data)
 
-        if data:
-            request.data = json.dumps(data).encode("utf-8")
-            request.add_header("Content-Type", "application/json")
+    def get(self, endpoint: str) -> RequestResponse:
+        return self._get_url(f"{self.base_url}/{endpoint}")
+
+    def _get_url(self, url: str) -> RequestResponse:
+        cached = self._etag_cache.get(url)
+        extra_headers = {"If-None-Match": cached[0]} if cached else None
+        response = self._send("GET", url, extra_headers=extra_headers)
+        if response.status_code == 304 and cached:
+            # Entries are kept in order of use, the oldest ones are pruned on save
+            self._etag_cache[url] = self._etag_cache.pop(url, cached)
+            # A 304 doesn't have to repeat the pagination links of the cached page
+            _, body, link = cached
+            if link and "Link" not in response.headers:
+                response.headers["Link"] = link
+            return RequestResponse(200, body, response.headers, "OK")
+
+        etag = response.headers.get("ETag")
+        if etag and response.status_code == 200:
+            self._etag_cache.pop(url, None)
+            self._etag_cache[url] = (
+                etag,
+                response.read(),
+                response.headers.get("Link"),
+            )
+        return response
+
+    def get_paginated(self, endpoint: str, key: Optional[str] = None) -> List:
+        """
+        Fetches every page of a list endpoint and concatenates the items.
+
+        `key` selects the list for endpoints wrapping it in an object, like `check-runs`.
+        Pages are requested 100 items at a time, and when GitHub advertises the last page
+        the remaining ones are fetched concurrently.
+        """
+        if "per_page=" not in endpoint:
+            separator = "&" if "?" in endpoint else "?"
+            endpoint = f"{endpoint}{separator}per_page=100"
+        response = self.get(endpoint)
+        items = list(response.json()[key] if key else response.json())
+
+        page_urls = self._remaining_page_urls(response.links)
+        if page_urls:
+            with ThreadPoolExecutor(
+                max_workers=min(PAGE_WORKERS, len(page_urls))
+            ) as executor:
+                for page in executor.map(self._get_url, page_urls):
+                    items.extend(page.json()[key] if key else page.json())
+            return items
 
+        next_url = response.links.get("next")
+        while next_url:
+            page = self._get_url(next_url)
+            items.extend(page.json()[key] if key else page.json())
+            next_url = page.links.get("next")
+        return items
+
+    @staticmethod
+    def _remaining_page_urls(links: Dict[str, str]) -> List[str]:
+        """
+        Builds the URLs of the pages between `next` and `last`, when both carry a page
+        number.
+        """
+        if "next" not in links or "last" not in links:
+            return []
+        next_url = urllib.parse.urlsplit(links["next"])
+        next_query = urllib.parse.parse_qs(next_url.query)
+        last_query = urllib.parse.parse_qs(urllib.parse.urlsplit(links["last"]).query)
         try:
-            http_response = urllib.request.urlopen(request, timeout=self.timeout)
-            return RequestResponse(http_response)
-        except urllib.error.HTTPError as e:
-            raise BoussoleError(f"HTTP Error: {e.code} - {e.reason}") from e
+            first_page = int(next_query["page"][0])
+            last_page = int(last_query["page"][0])
+        except (KeyError, ValueError):
+            return []
 
-    def get(self, endpoint: str) -> RequestResponse:
-        return self._make_request("GET", endpoint)
+        urls = []
+        for page in range(first_page, last_page + 1):
+            next_query["page"] = [str(page)]
+            query = urllib.parse.urlencode(next_query, doseq=True)
+            urls.append(urllib.parse.urlunsplit(next_url._replace(query=query)))
+        return urls
 
     def post(self, endpoint: str, data: Dict) -> RequestResponse:
         return self._make_request("POST", endpoint, data)
@@ -77,3 +518,36 @@ class GitHubAPI:
 
     def delete(self, endpoint: str, data: Optional[Dict] = None) -> RequestResponse:
         return self._make_request("DELETE", endpoint, data)
+
+    def graphql(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """
+        Runs a GraphQL query and returns its data.
+
+        Queries don't change anything, so unlike other POST requests they are retried like
+        a GET.
+        """
+        data, errors = self.graphql_partial(query, variables)
+        if errors:
+            raise BoussoleError(f"GraphQL Error: {_graphql_messages(errors)}")
+        return data
+
+    def graphql_partial(
+        self, query: str, variables: Optional[Dict] = None
+    ) -> Tuple[Dict, List[Dict]]:
+        """
+        Runs a GraphQL query and returns its data along with the errors of the fields that
+        could not be resolved, those fields are None in the data.
+
+        It only raises when no data came back at all.
+        """
+        response = self._send(
+            "POST",
+            self.graphql_url,
+            {"query": query, "variables": variables or {}},
+            idempotent=True,
+        )
+        payload = response.json()
+        errors = payload.get("errors") or []
+        if payload.get("data") is None:
+            raise BoussoleError(f"GraphQL Error: {_graphql_messages(errors)}")
+        return payload["data"], errors
@@ -99,12 +99,12 @@ Unable to process LGTM votes due to API error:
 3. Ensure the PR hasn't been closed or deleted
 """
 
-SELF_APPROVAL_ERROR = """
+SELF_APPROVAL_WARNING = """
 ### ⚠️ Invalid LGTM Vote
 
 * User **@{user}** attempted to approve their own PR
-* Self-approval is not permitted for security reasons
-* Please [delete the comment]({comment_url}) before continuing.
+* Self-approval is not permitted for security reasons, these votes are ignored:
+{comment_links}
 
 Please wait for reviews from other team members.
 """
@@ -173,7 +173,7 @@ Successfully cherry-picked changes from PR #{source_pr} to branch `{target_branc
 """
 
 CHERRY_PICK_CONFLICT = """
-🚨 Merge conflict detected while cherry-picking PR #{self.pr_num} to {target_branch}
+🚨 Merge conflict detected while cherry-picking PR #{pr_num} to {target_branch}
 • Progress: {current_commit}/{total_commits} commits
 • Conflicting commit: {commit_sha}
 
@@ -181,7 +181,7 @@ To resolve this conflict:
 1. Create a new branch from {target_branch}
 
 ```shell
-git checkout -b resolve-cherry-pick-{self.pr_num} origin/{target_branch}
+git checkout -b resolve-cherry-pick-{pr_num} origin/{target_branch}
 ```
 
 2. Cherry-pick the commits manually using:
@@ -194,8 +194,8 @@ git cherry-pick {commit_sha}
 4. Create a new PR with your changes
 
 ```shell
-git push YOURFORKREMOTE resolve-cherry-pick-{self.pr_num} --force-with-lease
-gh pr create --base {target_branch} --head YOURFORK:resolve-cherry-pick-{self.pr_num}
+git push YOURFORKREMOTE resolve-cherry-pick-{pr_num} --force-with-lease
+gh pr create --base {target_branch} --head YOURFORK:resolve-cherry-pick-{pr_num}
 ```
 
 Need assistance? Please contact the repository maintainers.
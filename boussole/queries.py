@@ -0,0 +1,93 @@
+# PR connections fetched with the bundle: (extra arguments, node selection). Each
+# connection returns up to 100 nodes per page.
+PR_CONNECTIONS = {
+    "reviews": ("states: APPROVED", "author { __typename login } authorAssociation"),
+    "comments": ("", "author { __typename login } authorAssociation body url"),
+    "commits": ("", "commit { oid message }"),
+}
+
+
+def _connection_field(name: str, paginated: bool = False) -> str:
+    extra_arguments, selection = PR_CONNECTIONS[name]
+    arguments = ", ".join(
+        argument
+        for argument in (
+            "first: 100",
+            extra_arguments,
+            "after: $after" if paginated else "",
+        )
+        if argument
+    )
+    return (
+        f"      {name}({arguments}) {{\n"
+        f"        nodes {{ {selection} }}\n"
+        "        pageInfo { hasNextPage endCursor }\n"
+        "      }\n"
+    )
+
+
+# Everything we need to know about a pull request, fetched in a single round trip.
+PR_BUNDLE_QUERY = (
+    "query($owner: String!, $name: String!, $number: Int!) {\n"
+    "  repository(owner: $owner, name: $name) {\n"
+    "    pullRequest(number: $number) {\n"
+    "      state\n"
+    "      baseRefName\n"
+    "      headRefOid\n"
+    f"{''.join(_connection_field(name) for name in PR_CONNECTIONS)}"
+    "    }\n"
+    "  }\n"
+    "}\n"
+)
+
+# Follow-up queries for the connections with more than 100 nodes.
+PR_CONNECTION_QUERIES = {
+    name: (
+        "query($owner: String!, $name: String!, $number: Int!, $after: String!) {\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        "    pullRequest(number: $number) {\n"
+        f"{_connection_field(name, paginated=True)}"
+        "    }\n"
+        "  }\n"
+        "}\n"
+    )
+    for name in PR_CONNECTIONS
+}
+
+# Aliased lookup of a single collaborator, repeated once per user in a batch. The
+# login argument is an exact match, unlike the query substring search.
+COLLABORATOR_PERMISSION_FIELD = """
+    u{index}: collaborators(login: $u{index}, first: 1) {{
+      edges {{ permission node {{ login }} }}
+    }}"""
+
+# GraphQL returns the fine-grained role, map it back to the REST permission names
+# used by PAC_LGTM_PERMISSIONS.
+GRAPHQL_PERMISSIONS = {
+    "ADMIN": "admin",
+    "MAINTAIN": "write",
+    "WRITE": "write",
+    "TRIAGE": "read",
+    "READ": "read",
+}
+
+# authorAssociation values that settle the permission without a lookup, only the owner
+# of a personal repository is certainly admin. The others are looked up: MEMBER and
+# COLLABORATOR don't tell the permission level, and org members with a private
+# membership show up as CONTRIBUTOR or NONE.
+ASSOCIATION_PERMISSIONS = {"OWNER": "admin"}
+
+
+def permissions_query(count: int) -> str:
+    """
+    Builds a query looking up the permission of `count` users, passed as the $u0..$uN
+    variables.
+    """
+    variables = "".join(f", $u{index}: String!" for index in range(count))
+    fields = "".join(
+        COLLABORATOR_PERMISSION_FIELD.format(index=index) for index in range(count)
+    )
+    return (
+        f"query($owner: String!, $name: String!{variables}) {{\n"
+        f"  repository(owner: $owner, name: $name) {{{fields}\n  }}\n}}"
+    )
@@ -1,18 +1,25 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring,missing-class-docstring,wrong-import-position
 import argparse
 import sys
+import threading
 from unittest.mock import MagicMock
 
 import pytest
 
 sys.path.append("../boussole")  # TODO: Find a better way to import the module
-from boussole.boussole import GitHubAPI, PRHandler  # Import main and PRHandler
+from boussole.boussole import (
+    GitHubAPI,
+    LGTMError,
+    PRHandler,
+)
+from boussole.client import BoussoleError
 
 
 class MyFakeResponse:
     def __init__(self, status_code, body):
         self.body = body
         self.status_code = status_code
+        self.links = {}
 
     def get(self, _key, default=None):
         return self.body if isinstance(self.body, dict) else default
@@ -21,13 +28,76 @@ class MyFakeResponse:
         return self.body
 
 
+def connection(nodes, end_cursor=None):
+    return {
+        "nodes": list(nodes),
+        "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor},
+    }
+
+
+def pr_bundle(comments=(), reviews=(), commits=(), state="OPEN"):
+    return {
+        "repository": {
+            "pullRequest": {
+                "state": state,
+                "baseRefName": "main",
+                "headRefOid": "abc123",
+                "reviews": connection({"author": {"login": u}} for u in reviews),
+                "comments": connection(comments),
+                "commits": connection({"commit": c} for c in commits),
+            }
+        }
+    }
+
+
+def lgtm_comment(login, url="http://test.url", association=None):
+    comment = {"body": "/lgtm", "author": {"login": login}, "url": url}
+    if association:
+        comment["authorAssociation"] = association
+    return comment
+
+
+def permissions(*users):
+    """
+    (login, GRAPHQL_PERMISSION or None) pairs, in the order they are queried.
+    """
+    return {
+        "repository": {
+            f"u{index}": {
+                "edges": [{"permission": perm, "node": {"login": login}}]
+                if perm
+                else []
+            }
+            for index, (login, perm) in enumerate(users)
+        }
+    }
+
+
+def routes(responses):
+    """
+    Answers api.get() by endpoint, the merge pre-flight calls run concurrently.
+    """
+
+    def fake_get(endpoint):
+        for prefix, response in responses.items():
+            if endpoint.startswith(prefix):
+                return response
+        raise AssertionError(f"unexpected call to {endpoint}")
+
+    return fake_get
+
+
 @pytest.fixture
 def mock_api():
     api = GitHubAPI(
         "https://api.github.com/repos/test/repo", {"Authorization": "Bearer test_token"}
     )
-    for method in ("get", "post", "put", "delete"):
+    for method in ("get", "post", "put", "delete", "graphql"):
         setattr(api, method, MagicMock())
+    # Answered by the graphql mock, without errors
+    api.graphql_partial = MagicMock(
+        side_effect=lambda query, variables: (api.graphql(query, variables), [])
+    )
     return api
 
 
@@ -40,6 +110,7 @@ def mock_args():
         lgtm_threshold=2,
         lgtm_permissions="admin,write",
         lgtm_review_event="APPROVE",
+        ignore_users="ci-robot",
         merge_method="squash",
         repo_owner="test",
         repo_name="repo",
@@ -81,8 +152,45 @@ def test_label(pr_handler, mock_api):
 
 
 def test_unlabel(pr_handler, mock_api):
-    pr_handler.unlabel(["bug"])
-    mock_api.delete.assert_called_once_with("issues/123/labels/bug")
+    mock_api.get.return_value = MyFakeResponse(
+        200, [{"name": "bug"}, {"name": "ok-to-test"}]
+    )
+    response = pr_handler.unlabel(["bug"])
+    mock_api.get.assert_called_once_with("issues/123/labels?per_page=100")
+    mock_api.put.assert_called_once_with(
+        "issues/123/labels", {"labels": ["ok-to-test"]}
+    )
+    mock_api.delete.assert_not_called()
+    assert response is mock_api.put.return_value
+
+
+def test_unlabel_multiple(pr_handler, mock_api):
+    mock_api.get.return_value = MyFakeResponse(
+        200,
+        [
+            {"name": "Bug"},
+            {"name": "enhancement"},
+            {"name": "lgtm"},
+            {"name": "triage"},
+        ],
+    )
+    pr_handler.unlabel(["bug", "enhancement", "triage"])
+    mock_api.put.assert_called_once_with("issues/123/labels", {"labels": ["lgtm"]})
+    mock_api.post.assert_called_once_with(
+        "issues/123/comments",
+        {"body": "✅ Removed labels: <b>bug, enhancement, triage</b>."},
+    )
+
+
+def test_cherry_pick(pr_handler, mock_api):
+    response = pr_handler.cherry_pick(["release-1.0"])
+    assert response is mock_api.post.return_value
+    mock_api.post.assert_called_once_with(
+        "issues/123/comments",
+        {
+            "body": "✅ We will cherry-pick this PR to the branch `release-1.0` upon merge."
+        },
+    )
 
 
 def test_check_membership(pr_handler, mock_api):
@@ -94,75 +202,294 @@ def test_check_membership(pr_handler, mock_api):
 
 
 def test_lgtm(pr_handler, mock_api):
-    mock_api.get.return_value.status_code = 200
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("reviewer1"), lgtm_comment("reviewer2")]),
+        permissions(("reviewer1", "WRITE"), ("reviewer2", "MAINTAIN")),
+    ]
 
-    # Mock response for PR comments
-    def mock_json_comments():
-        return [
-            {"body": "/lgtm", "user": {"login": "reviewer1"}},
-            {"body": "/lgtm", "user": {"login": "reviewer2"}},
-        ]
+    assert pr_handler.lgtm() == 2
+    # All the voters permissions are fetched with a single query
+    assert mock_api.graphql.call_count == 2
+    mock_api.get.assert_not_called()
+
+
+def test_lgtm_trusts_owner_association(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(
+            comments=[
+                lgtm_comment("owner", association="OWNER"),
+                lgtm_comment("private-member", association="NONE"),
+                lgtm_comment("reviewer1", association="COLLABORATOR"),
+            ]
+        ),
+        permissions(("private-member", "WRITE"), ("reviewer1", "WRITE")),
+    ]
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes(full_scan=True)
+
+    assert valid_votes == 3
+    # Org members with a private membership show up as NONE, their vote counts
+    assert lgtm_users == {
+        "owner": "admin",
+        "private-member": "write",
+        "reviewer1": "write",
+    }
+    # Only the owner skipped the lookup
+    assert mock_api.graphql.call_args[0][1] == {
+        "owner": "test",
+        "name": "repo",
+        "u0": "private-member",
+        "u1": "reviewer1",
+    }
+
+
+def test_lgtm_skips_bots_and_ignored_users(pr_handler, mock_api):
+    bot_comment = lgtm_comment("dependabot")
+    bot_comment["author"]["__typename"] = "Bot"
+    mock_api.graphql.side_effect = [
+        pr_bundle(
+            comments=[
+                bot_comment,
+                lgtm_comment("renovate[bot]"),
+                lgtm_comment("CI-Robot"),
+                lgtm_comment("reviewer1"),
+            ]
+        ),
+        permissions(("reviewer1", "WRITE")),
+    ]
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes(full_scan=True)
 
-    # Mock response for permissions
-    def mock_json_permissions():
-        return {"permission": "write"}
+    assert valid_votes == 1
+    assert lgtm_users == {"reviewer1": "write"}
+    assert mock_api.graphql.call_count == 2
 
-    # Assign the side_effect to return different results on multiple calls
-    mock_api.get.return_value.json.side_effect = [
-        [],
-        mock_json_comments(),  # First call to json() -> PR comments
-        mock_json_permissions(),  # Second call to json() -> reviewer1 permission
-        mock_json_permissions(),  # Third call to json() -> reviewer2 permission
+
+def test_lgtm_votes_stop_at_threshold(pr_handler, mock_api):
+    voters = [f"reviewer{i}" for i in range(45)]
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment(user) for user in voters]),
+        # Only one valid vote in the first batch, the threshold is 2
+        permissions(("reviewer0", "WRITE"), *((user, None) for user in voters[1:20])),
+        permissions(("reviewer20", "ADMIN"), *((user, None) for user in voters[21:40])),
+    ]
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes()
+
+    assert valid_votes == 2
+    # The last batch was never looked up
+    assert list(lgtm_users) == voters[:40]
+    assert mock_api.graphql.call_count == 3
+
+
+def test_lgtm_without_comment_stops_at_threshold(pr_handler, mock_api):
+    voters = [f"reviewer{i}" for i in range(25)]
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment(user) for user in voters]),
+        permissions(
+            ("reviewer0", "WRITE"),
+            ("reviewer1", "ADMIN"),
+            *((user, None) for user in voters[2:20]),
+        ),
     ]
 
-    assert pr_handler.lgtm() == 2
-    mock_api.get.return_value.status_code = 200
+    assert pr_handler.lgtm(send_comment=False) == 2
+    assert mock_api.graphql.call_count == 2
 
 
-def test_lgtm_by_review_request(pr_handler, mock_api, capsys):
-    mock_api.get.return_value.status_code = 200
+def test_lgtm_scan_collects_cherry_picks(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(
+            comments=[
+                lgtm_comment("reviewer1"),
+                {"body": "/cherry-pick release-1.0", "author": {"login": "a"}},
+                {"body": "/CHERRY-PICK release-2.0", "author": None},
+            ]
+        ),
+        permissions(("reviewer1", "WRITE")),
+    ]
+    pr_handler._fetch_and_validate_lgtm_votes()
+    assert pr_handler._cherry_pick_branches == {"release-1.0", "release-2.0"}
 
-    # Mock response for PR comments with self-approval
-    mock_api.get.return_value.json.side_effect = [
-        [
-            {"state": "APPROVED", "user": {"login": "reviewer1"}},
-            {"state": "APPROVED", "user": {"login": "reviewer2"}},
-        ],
-        [],
-        {"permission": "write"},
-        {"permission": "write"},
+
+def test_lgtm_votes_computed_once(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("reviewer1")]),
+        permissions(("reviewer1", "WRITE")),
+    ]
+    first = pr_handler._fetch_and_validate_lgtm_votes()
+    assert (
+        pr_handler._fetch_and_validate_lgtm_votes()
+        == first
+        == (
+            1,
+            {"reviewer1": "write"},
+        )
+    )
+    assert mock_api.graphql.call_count == 2
+
+
+def test_lgtm_by_review_request(pr_handler, mock_api, capsys):
+    mock_api.graphql.side_effect = [
+        pr_bundle(reviews=["reviewer1", "reviewer2"]),
+        permissions(("reviewer1", "WRITE"), ("reviewer2", "ADMIN")),
     ]
     pr_handler.lgtm()
     assert "PR approved with LGTM votes" in capsys.readouterr().out
 
 
+def test_lgtm_permissions_exact_login(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("bob")]),
+        permissions(("bobby", "WRITE")),
+    ]
+    _, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes()
+    assert lgtm_users == {"bob": None}
+    # Looked up by exact login, not with the substring search
+    query = mock_api.graphql.call_args[0][0]
+    assert "collaborators(login: $u0, first: 1)" in query
+    assert "query:" not in query
+
+
+def test_lgtm_permissions_partial_batch(pr_handler, mock_api):
+    mock_api.graphql.return_value = pr_bundle(
+        comments=[lgtm_comment(user) for user in ("alice", "bob", "carol")]
+    )
+    data = permissions(("alice", "WRITE"), ("bob", "WRITE"), ("carol", "ADMIN"))
+    data["repository"]["u1"] = None
+    errors = [{"message": "Something went wrong", "path": ["repository", "u1"]}]
+    mock_api.graphql_partial.side_effect = None
+    mock_api.graphql_partial.return_value = data, errors
+
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes(full_scan=True)
+
+    # Only the user whose alias errored is left unverified
+    assert valid_votes == 2
+    assert lgtm_users == {"alice": "write", "bob": None, "carol": "admin"}
+    # and it is looked up again next time
+    assert "bob" not in pr_handler._permission_cache
+
+
+def test_lgtm_permissions_batched(pr_handler, mock_api):
+    voters = [f"reviewer{i}" for i in range(45)]
+
+    def fake_graphql(_query, variables):
+        if "number" in variables:
+            return pr_bundle(comments=[lgtm_comment(user) for user in voters])
+        if variables["u0"] == "reviewer20":
+            raise BoussoleError("HTTP Error: 502 - Bad Gateway", 502)
+        users = [variables[f"u{i}"] for i in range(len(variables) - 2)]
+        return permissions(*((user, "WRITE") for user in users))
+
+    mock_api.graphql.side_effect = fake_graphql
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes(full_scan=True)
+
+    # 1 bundle query and 3 batches of at most 20 users
+    assert mock_api.graphql.call_count == 4
+    assert list(lgtm_users) == voters
+    # The failed batch falls back to no permission
+    assert valid_votes == 25
+    assert lgtm_users["reviewer20"] is None
+    assert lgtm_users["reviewer40"] == "write"
+
+
+def test_pr_json_follows_pages(pr_handler, mock_api):
+    first_page = pr_bundle(comments=[lgtm_comment("reviewer1")])
+    first_page["repository"]["pullRequest"]["comments"] = connection(
+        [lgtm_comment("reviewer1")], end_cursor="cursor1"
+    )
+    mock_api.graphql.side_effect = [
+        first_page,
+        {"repository": {"pullRequest": {"comments": connection([lgtm_comment("r2")])}}},
+    ]
+
+    # The bundle alone doesn't follow the pages
+    pr_handler.check_status("123", "open", bundle=True)
+    assert mock_api.graphql.call_count == 1
+
+    comments = pr_handler._pr_connection("comments")
+    assert [c["author"]["login"] for c in comments] == ["reviewer1", "r2"]
+    assert mock_api.graphql.call_args[0][1]["after"] == "cursor1"
+
+
+def test_pr_connection_resumes_after_failed_page(pr_handler, mock_api):
+    first_page = pr_bundle()
+    first_page["repository"]["pullRequest"]["commits"] = connection(
+        [{"oid": "c1"}], end_cursor="cursor1"
+    )
+    mock_api.graphql.side_effect = [
+        first_page,
+        BoussoleError("Bad Gateway", 502),
+        {"repository": {"pullRequest": {"commits": connection([{"oid": "c2"}])}}},
+    ]
+
+    with pytest.raises(BoussoleError):
+        pr_handler._pr_connection("commits")
+
+    # The next caller fetches the missing page instead of a truncated list
+    assert pr_handler._pr_connection("commits") == [{"oid": "c1"}, {"oid": "c2"}]
+    assert mock_api.graphql.call_args[0][1]["after"] == "cursor1"
+    assert pr_handler._pr_connection("commits") == [{"oid": "c1"}, {"oid": "c2"}]
+    assert mock_api.graphql.call_count == 3
+
+
 def test_lgtm_self_approval(pr_handler, mock_api):
-    mock_api.get.return_value.status_code = 200
+    pr_handler.comment_sender = "test_user"
+    mock_api.graphql.return_value = pr_bundle(
+        comments=[
+            lgtm_comment("test_user", "http://first.url"),
+            lgtm_comment("reviewer1"),
+            lgtm_comment("test_user", "http://second.url"),
+        ]
+    )
 
-    # Mock response for PR comments with self-approval
-    mock_api.get.return_value.json.side_effect = [
-        [],
-        [
-            {
-                "body": "/lgtm",
-                "user": {"login": "test_user"},
-                "html_url": "http://test.url",
-            },
-        ],
+    mock_api.graphql.side_effect = [
+        mock_api.graphql.return_value,
+        permissions(("reviewer1", "WRITE")),
     ]
 
-    with pytest.raises(SystemExit) as exc_info:
-        pr_handler.lgtm()
-    assert exc_info.value.code == 1
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes()
+    # The self-approvals are ignored, the other votes still count
+    assert valid_votes == 1
+    assert lgtm_users == {"reviewer1": "write"}
+    # A single warning comment, listing every self-approval
+    mock_api.post.assert_called_once()
+    body = mock_api.post.call_args[0][1]["body"]
+    assert "http://first.url" in body
+    assert "http://second.url" in body
+
+
+def test_lgtm_self_approval_warned_once(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(
+            comments=[
+                lgtm_comment("test_user", "http://first.url"),
+                lgtm_comment("reviewer1"),
+            ]
+        ),
+        permissions(("reviewer1", "WRITE")),
+    ]
+
+    # The author was already warned when posting the self-approval
+    assert pr_handler._fetch_and_validate_lgtm_votes()[0] == 1
+    mock_api.post.assert_not_called()
 
 
 def test_lgtm_comments_fetch_error(pr_handler, mock_api):
-    mock_api.get.return_value.status_code = 500
-    mock_api.get.return_value.text = "API Error"
+    mock_api.graphql.side_effect = BoussoleError("HTTP Error: 500 - API Error", 500)
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(LGTMError) as exc_info:
         pr_handler.lgtm()
-    assert exc_info.value.code == 1
+    assert exc_info.value.status_code == 500
+
+
+def test_lgtm_not_enough_votes(pr_handler, mock_api):
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("reviewer1")]),
+        permissions(("reviewer1", "WRITE")),
+    ]
+
+    assert pr_handler.lgtm() == 1
+    # No approval, only the breakdown comment
+    mock_api.post.assert_called_once()
+    assert mock_api.post.call_args[0][0] == "issues/123/comments"
 
 
 def test_check_membership_invalid_response(pr_handler, mock_api):
@@ -172,6 +499,30 @@ def test_check_membership_invalid_response(pr_handler, mock_api):
     assert is_valid is False
 
 
+def test_check_membership_not_collaborator(pr_handler, mock_api):
+    mock_api.get.side_effect = BoussoleError("HTTP Error: 404 - Not Found", 404)
+    assert pr_handler._check_membership("outsider") == (None, False)
+    assert pr_handler._check_membership("outsider") == (None, False)
+    # A missing collaborator is a definitive answer, it is not asked again
+    mock_api.get.assert_called_once()
+
+
+def test_check_membership_lookup_error(capsys, pr_handler, mock_api):
+    mock_api.get.side_effect = BoussoleError("HTTP Error: 500 - Server Error", 500)
+    assert pr_handler._check_membership("reviewer") == (None, False)
+    assert "500" in capsys.readouterr().err
+
+
+def test_merge_pr_not_collaborator(pr_handler, mock_api):
+    mock_api.get.side_effect = BoussoleError("HTTP Error: 404 - Not Found", 404)
+    mock_api.graphql.return_value = pr_bundle()
+
+    with pytest.raises(SystemExit) as exc_info:
+        pr_handler.merge_pr()
+    assert exc_info.value.code == 1
+    assert "Insufficient Permissions" in mock_api.post.call_args[0][1]["body"]
+
+
 def test_merge_pr_no_all_checks_succeed(capsys, pr_handler, mock_api):
     all_checks = MyFakeResponse(
         200,
@@ -193,13 +544,15 @@ def test_merge_pr_no_all_checks_succeed(capsys, pr_handler, mock_api):
         },
     )
 
-    mock_responses = [
-        MyFakeResponse(200, {"permission": "admin"}),
-        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
-        all_checks,
-    ]
-
-    mock_api.get.side_effect = mock_responses
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+            "commits/abc123/check-runs": all_checks,
+        }
+    )
+    mock_api.graphql.return_value = pr_bundle()
 
     with pytest.raises(SystemExit) as exc_info:
         pr_handler.merge_pr()
@@ -208,14 +561,6 @@ def test_merge_pr_no_all_checks_succeed(capsys, pr_handler, mock_api):
 
 
 def test_merge_pr_success(pr_handler, mock_api):
-    all_comments = MyFakeResponse(
-        200,
-        [
-            {"body": "/lgtm", "user": {"login": "reviewer1"}},
-            {"body": "/lgtm", "user": {"login": "reviewer2"}},
-        ],
-    )
-
     all_checks = MyFakeResponse(
         200,
         {
@@ -230,26 +575,26 @@ def test_merge_pr_success(pr_handler, mock_api):
         },
     )
 
-    mock_responses = [
-        MyFakeResponse(200, {"permission": "admin"}),
-        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
-        all_checks,
-        MyFakeResponse(200, {}),
-        all_comments,
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer2
-        all_comments,
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer2
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+            "commits/abc123/check-runs": all_checks,
+        }
+    )
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("reviewer1"), lgtm_comment("reviewer2")]),
+        permissions(("reviewer1", "WRITE"), ("reviewer2", "WRITE")),
     ]
 
-    mock_api.get.side_effect = mock_responses
-
     # Mock successful merge
     mock_api.put.return_value.status_code = 200
     mock_api.post.return_value.status_code = 200
 
     assert pr_handler.merge_pr() is True
+    # The voters lookup went through GraphQL once
+    assert mock_api.graphql.call_count == 2
 
     # Verify merge call
     mock_api.put.assert_called_with(
@@ -262,21 +607,198 @@ def test_merge_pr_success(pr_handler, mock_api):
     )
 
 
+def test_merge_pr_reuses_sender_permission(pr_handler, mock_api):
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+            "commits/abc123/check-runs": MyFakeResponse(200, {"check_runs": []}),
+        }
+    )
+    mock_api.graphql.side_effect = [
+        pr_bundle(comments=[lgtm_comment("reviewer"), lgtm_comment("reviewer1")]),
+        permissions(("reviewer1", "WRITE")),
+    ]
+    mock_api.put.return_value.status_code = 200
+
+    assert pr_handler.merge_pr() is True
+    # Only reviewer1 was looked up, the merge sender permission was reused
+    assert mock_api.graphql.call_args[0][1]["u0"] == "reviewer1"
+    assert "u1" not in mock_api.graphql.call_args[0][1]
+
+
+def test_merge_pr_cherry_picks(pr_handler, mock_api):
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+            "commits/abc123/check-runs": MyFakeResponse(200, {"check_runs": []}),
+            "git/refs/heads/release-1.0": MyFakeResponse(
+                200, {"object": {"sha": "rel1"}}
+            ),
+            "git/refs/heads/release-2.0": MyFakeResponse(
+                200, {"object": {"sha": "rel2"}}
+            ),
+        }
+    )
+    mock_api.graphql.side_effect = [
+        pr_bundle(
+            comments=[
+                lgtm_comment("reviewer"),
+                lgtm_comment("reviewer1"),
+                {"body": "/cherry-pick release-1.0", "author": {"login": "reviewer"}},
+                {"body": "/cherry-pick release-2.0", "author": {"login": "reviewer"}},
+            ],
+            commits=[
+                {"oid": "c1", "message": "first"},
+                {"oid": "c2", "message": "second"},
+            ],
+        ),
+        permissions(("reviewer1", "WRITE")),
+    ]
+    mock_api.put.return_value.status_code = 200
+    mock_api.post.return_value = MyFakeResponse(201, {"sha": "new"})
+
+    assert pr_handler.merge_pr() is True
+    merges = [c[0][1] for c in mock_api.post.call_args_list if c[0][0] == "merges"]
+    for branch in ("release-1.0", "release-2.0"):
+        # Commits are merged in order on each target branch
+        assert [m["head"] for m in merges if m["base"] == branch] == ["c1", "c2"]
+
+
+def test_merge_pr_cherry_picks_every_commit_page(pr_handler, mock_api):
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+            "commits/abc123/check-runs": MyFakeResponse(200, {"check_runs": []}),
+            "git/refs/heads/": MyFakeResponse(200, {"object": {"sha": "rel"}}),
+        }
+    )
+    bundle = pr_bundle(
+        comments=[
+            lgtm_comment("reviewer", association="OWNER"),
+            lgtm_comment("reviewer1", association="OWNER"),
+            {"body": "/cherry-pick release-1.0", "author": {"login": "reviewer"}},
+            {"body": "/cherry-pick release-2.0", "author": {"login": "reviewer"}},
+        ],
+    )
+    bundle["repository"]["pullRequest"]["commits"] = connection(
+        [{"commit": {"oid": "c1", "message": "first"}}], end_cursor="cursor1"
+    )
+    second_page = {
+        "repository": {
+            "pullRequest": {
+                "commits": connection([{"commit": {"oid": "c2", "message": "second"}}])
+            }
+        }
+    }
+
+    mock_api.graphql.side_effect = lambda _query, variables: (
+        second_page if "after" in variables else bundle
+    )
+    # Both cherry-pick threads ask for the commits before either one gets them
+    both_started = threading.Barrier(2, timeout=5)
+    get_pr_commits = pr_handler._get_pr_commits
+
+    def fake_get_pr_commits():
+        both_started.wait()
+        return get_pr_commits()
+
+    pr_handler._get_pr_commits = fake_get_pr_commits
+    mock_api.put.return_value.status_code = 200
+    mock_api.post.return_value = MyFakeResponse(201, {"sha": "new"})
+
+    assert pr_handler.merge_pr() is True
+    merges = [c[0][1] for c in mock_api.post.call_args_list if c[0][0] == "merges"]
+    for branch in ("release-1.0", "release-2.0"):
+        # Both branches get the commits of the second page
+        assert [m["head"] for m in merges if m["base"] == branch] == ["c1", "c2"]
+
+
+def test_cherry_pick_conflict(pr_handler, mock_api):
+    mock_api.get.return_value = MyFakeResponse(200, {"object": {"sha": "rel1"}})
+    mock_api.graphql.return_value = pr_bundle(
+        commits=[{"oid": "c1", "message": "first"}]
+    )
+    mock_api.post.side_effect = [
+        BoussoleError("HTTP Error: 409 - Conflict", 409),
+        MagicMock(),
+    ]
+
+    assert pr_handler._perform_cherry_pick("release-1.0") is False
+    body = mock_api.post.call_args[0][1]["body"]
+    assert "cherry-picking PR #123 to release-1.0" in body
+    assert "git cherry-pick c1" in body
+
+
+def test_cherry_pick_creates_missing_branch(pr_handler, mock_api):
+    mock_api.get.side_effect = [
+        BoussoleError("HTTP Error: 404 - Not Found", 404),
+        MyFakeResponse(200, {"object": {"sha": "merged123"}}),
+    ]
+    mock_api.graphql.return_value = pr_bundle(
+        commits=[{"oid": "c1", "message": "first"}]
+    )
+    mock_api.post.side_effect = [
+        MyFakeResponse(201, {}),
+        MyFakeResponse(201, {"sha": "picked"}),
+        MagicMock(),
+    ]
+
+    assert pr_handler._perform_cherry_pick("release-2.0") is True
+    assert mock_api.post.call_args_list[0][0] == (
+        "git/refs",
+        {"ref": "refs/heads/release-2.0", "sha": "merged123"},
+    )
+    # The new branch starts from the base branch tip, after the merge
+    assert mock_api.get.call_args_list[1][0] == ("git/refs/heads/main",)
+    assert "picked" in mock_api.post.call_args[0][1]["body"]
+
+
+def test_cherry_pick_error_is_reported(pr_handler, mock_api):
+    mock_api.get.return_value = MyFakeResponse(200, {"object": {"sha": "rel1"}})
+    mock_api.graphql.return_value = pr_bundle(
+        commits=[{"oid": "c1", "message": "first"}]
+    )
+    mock_api.post.side_effect = [
+        BoussoleError("HTTP Error: 422 - Unprocessable Entity", 422),
+        MagicMock(),
+    ]
+
+    assert pr_handler._perform_cherry_pick("release-1.0") is False
+    body = mock_api.post.call_args[0][1]["body"]
+    assert "Cherry Pick Failed" in body
+    assert "`422`" in body
+
+
 def test_merge_pr_insufficient_permissions(pr_handler, mock_api):
     # Mock permission check failure
     mock_api.get.return_value.status_code = 200
     mock_api.get.return_value.json.return_value = {"permission": "read"}
+    mock_api.graphql.return_value = pr_bundle()
+    pr_handler.lgtm_permissions = frozenset(["write", "admin"])
 
     with pytest.raises(SystemExit) as exc_info:
         pr_handler.merge_pr()
     assert exc_info.value.code == 1
+    # Listed in a stable order
+    assert "`admin, write`" in mock_api.post.call_args[0][1]["body"]
 
 
 def test_merge_pr_failure(pr_handler, mock_api):
-    mock_responses = [
-        MyFakeResponse(200, {"permission": "peon"}),
-    ]
-    mock_api.get.side_effect = mock_responses
+    mock_api.get.side_effect = routes(
+        {
+            "collaborators/reviewer/permission": MyFakeResponse(
+                200, {"permission": "peon"}
+            ),
+            "commits/abc123/check-runs": MyFakeResponse(200, {"check_runs": []}),
+        }
+    )
+    mock_api.graphql.return_value = pr_bundle()
 
     # Mock failed merge
     mock_api.put.return_value.status_code = 405
@@ -298,22 +820,37 @@ def test_post_lgtm_breakdown(pr_handler, mock_api):
     assert "| @user3 | `admin`" in call_args["body"]
 
 
-def test_check_status(pr_handler, mock_api):
+def test_check_status(mock_api, mock_args):
     # Mock successful response with state "open"
-    mock_api.get.return_value.status_code = 200
-    mock_api.get.return_value.json.return_value = {"state": "open"}
+    mock_api.get.return_value = MyFakeResponse(200, {"state": "open"})
+    pr_handler = PRHandler(api=mock_api, args=mock_args)
     assert pr_handler.check_status("123", "open") is True
     assert pr_handler.check_status("123", "closed") is False
 
     # Mock successful response with state "closed"
-    mock_api.get.return_value.status_code = 200
-    mock_api.get.return_value.json.return_value = {"state": "closed"}
+    mock_api.get.return_value = MyFakeResponse(200, {"state": "closed"})
+    pr_handler = PRHandler(api=mock_api, args=mock_args)
     assert pr_handler.check_status("123", "open") is False
     assert pr_handler.check_status("123", "closed") is True
 
+    # Only the PR itself is fetched, not the bundle
+    mock_api.get.assert_called_with("pulls/123")
+    mock_api.graphql.assert_not_called()
+
     # Mock unsuccessful response
-    mock_api.get.return_value.status_code = 404
-    mock_api.get.return_value.text = "Not Found"
+    mock_api.get.side_effect = BoussoleError("HTTP Error: 404 - Not Found", 404)
+    pr_handler = PRHandler(api=mock_api, args=mock_args)
     with pytest.raises(SystemExit) as exc_info:
         pr_handler.check_status("123", "open")
     assert exc_info.value.code == 1
+
+
+def test_check_status_from_bundle(mock_api, mock_args):
+    mock_api.graphql.return_value = pr_bundle(state="MERGED")
+    pr_handler = PRHandler(api=mock_api, args=mock_args)
+    assert pr_handler.check_status("123", "open", bundle=True) is False
+    assert pr_handler.check_status("123", "closed") is True
+
+    # The state comes with the bundle the command fetches anyway
+    assert mock_api.graphql.call_count == 1
+    mock_api.get.assert_not_called()
@@ -0,0 +1,397 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,missing-class-docstring
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from boussole.client import BoussoleError, GitHubAPI
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):  # pylint: disable=arguments-differ
+        pass
+
+    def _reply(self, status, payload, etag=None, link=None, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if link:
+            self.send_header("Link", link)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.requests.append((self.path, self.client_address))
+        self.server.user_agents.append(self.headers.get("User-Agent"))
+        etag = self.server.etags.get(self.path)
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        replies = self.server.replies.get(self.path)
+        status, payload, *headers = (
+            replies.pop(0) if replies else (200, {"path": self.path})
+        )
+        self._reply(
+            status,
+            payload,
+            etag,
+            self.server.links.get(self.path),
+            headers[0] if headers else None,
+        )
+        # Close the keep-alive connection without telling the client
+        if self.path in self.server.dropped:
+            self.close_connection = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.path, self.client_address))
+        time.sleep(self.server.post_delay)
+        replies = self.server.replies.get(self.path)
+        status, payload, *headers = (
+            replies.pop(0) if replies else (201, {"path": self.path})
+        )
+        self._reply(status, payload, headers=headers[0] if headers else None)
+
+    def do_CONNECT(self):  # pylint: disable=invalid-name
+        self.server.requests.append((self.path, self.client_address))
+        self.server.proxy_authorizations.append(self.headers.get("Proxy-Authorization"))
+        self.send_response(502)
+        self.end_headers()
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+    httpd.requests = []
+    httpd.user_agents = []
+    httpd.proxy_authorizations = []
+    httpd.replies = {}
+    httpd.etags = {}
+    httpd.links = {}
+    httpd.dropped = set()
+    httpd.post_delay = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def api(server):
+    host, port = server.server_address
+    client = GitHubAPI(f"http://{host}:{port}/repos/test/repo", {})
+    client.backoff_factor = 0
+    yield client
+    client.close()
+
+
+def test_connection_is_reused(api, server):
+    assert api.get("pulls/1").json() == {"path": "/repos/test/repo/pulls/1"}
+    assert api.get("pulls/2").status_code == 200
+    assert len(server.requests) == 2
+    # Same client port means the same keep-alive connection served both calls
+    assert server.requests[0][1] == server.requests[1][1]
+
+
+def test_user_agent_is_sent(api, server):
+    api.get("pulls/1")
+    assert server.user_agents == ["pac-boussole"]
+
+
+def test_retry_on_gateway_error(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [(502, {}), (503, {}), (200, {})]
+    assert api.get("pulls/1").status_code == 200
+    assert len(server.requests) == 3
+
+
+def test_retry_after_rate_limit(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (429, {}, {"Retry-After": "0"}),
+        (403, {"message": "secondary rate limit"}, {"Retry-After": "0"}),
+        (200, {}),
+    ]
+    assert api.get("pulls/1").status_code == 200
+    assert len(server.requests) == 3
+
+
+def test_distant_rate_limit_reset_is_not_waited_for(api, server):
+    reset = str(int(time.time()) + 3600)
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (403, {}, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}),
+        (200, {}),
+    ]
+    started = time.monotonic()
+    with pytest.raises(BoussoleError) as exc_info:
+        api.get("pulls/1")
+    assert exc_info.value.status_code == 403
+    assert time.monotonic() - started < 1
+    assert len(server.requests) == 1
+
+
+def test_long_retry_after_is_not_waited_for(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (429, {}, {"Retry-After": "600"}),
+        (200, {}),
+    ]
+    with pytest.raises(BoussoleError) as exc_info:
+        api.get("pulls/1")
+    assert exc_info.value.status_code == 429
+    assert len(server.requests) == 1
+
+
+def test_low_rate_limit_does_not_pause(api, server):
+    reset = str(int(time.time()) + 3600)
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (200, {}, {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": reset})
+    ]
+    started = time.monotonic()
+    assert api.get("pulls/1").status_code == 200
+    assert time.monotonic() - started < 1
+
+
+def test_forbidden_is_not_retried(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [(403, {"message": "Forbidden"})]
+    with pytest.raises(BoussoleError) as exc_info:
+        api.get("pulls/1")
+    assert exc_info.value.status_code == 403
+    assert len(server.requests) == 1
+
+
+def test_post_is_not_retried_once_sent(api, server):
+    api.timeout = 0.2
+    server.post_delay = 0.5
+    with pytest.raises(BoussoleError):
+        api.post("issues/1/comments", {"body": "hello"})
+    # The server got the comment once, even though the client gave up on it
+    time.sleep(0.5)
+    assert len(server.requests) == 1
+
+
+def test_post_gateway_error_is_not_retried(api, server):
+    server.replies["/repos/test/repo/issues/1/comments"] = [(502, {}), (201, {})]
+    with pytest.raises(BoussoleError) as exc_info:
+        api.post("issues/1/comments", {"body": "hello"})
+    assert exc_info.value.status_code == 502
+    assert len(server.requests) == 1
+
+
+def test_graphql_gateway_error_is_retried(api, server):
+    server.replies["/graphql"] = [(502, {}), (200, {"data": {"viewer": {}}})]
+    assert api.graphql("query { viewer { login } }") == {"viewer": {}}
+    assert len(server.requests) == 2
+
+
+def test_graphql_partial_data(api, server):
+    payload = {
+        "data": {"repository": {"u0": {"edges": []}, "u1": None}},
+        "errors": [{"message": "boom", "path": ["repository", "u1"]}],
+    }
+    server.replies["/graphql"] = [(200, payload), (200, payload)]
+    data, errors = api.graphql_partial("query { repository { u0 u1 } }")
+    assert data == payload["data"]
+    assert errors == payload["errors"]
+    # graphql() still refuses partial data
+    with pytest.raises(BoussoleError):
+        api.graphql("query { repository { u0 u1 } }")
+
+
+def test_post_after_dropped_connection(api, server):
+    server.dropped.add("/repos/test/repo/pulls/1")
+    api.get("pulls/1")
+    time.sleep(0.1)
+    # The closed keep-alive connection is not reused, the POST goes out once
+    assert api.post("issues/1/comments", {"body": "hello"}).status_code == 201
+    assert len(server.requests) == 2
+    assert server.requests[0][1] != server.requests[1][1]
+
+
+def test_http_proxy_is_used(server, monkeypatch):
+    host, port = server.server_address
+    monkeypatch.setenv("HTTP_PROXY", f"http://{host}:{port}")
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    monkeypatch.delenv("no_proxy", raising=False)
+    client = GitHubAPI("http://github.invalid/repos/test/repo", {})
+    # The proxy is asked for the absolute URL of the unresolvable host
+    assert client.get("pulls/1").json() == {
+        "path": "http://github.invalid/repos/test/repo/pulls/1"
+    }
+    client.close()
+
+
+def test_https_proxy_tunnels(server, monkeypatch):
+    host, port = server.server_address
+    monkeypatch.setenv("HTTPS_PROXY", f"http://user:secret@{host}:{port}")
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    monkeypatch.delenv("no_proxy", raising=False)
+    client = GitHubAPI("https://api.github.com/repos/test/repo", {})
+    client.retries = 0
+    with pytest.raises(BoussoleError):
+        client.get("pulls/1")
+    assert server.requests[0][0] == "api.github.com:443"
+    assert server.proxy_authorizations == ["Basic dXNlcjpzZWNyZXQ="]
+
+
+def test_no_proxy_bypasses_proxy(server, monkeypatch):
+    host, port = server.server_address
+    monkeypatch.setenv("HTTP_PROXY", "http://proxy.invalid:3128")
+    monkeypatch.setenv("NO_PROXY", host)
+    client = GitHubAPI(f"http://{host}:{port}/repos/test/repo", {})
+    assert client.get("pulls/1").status_code == 200
+    client.close()
+
+
+def test_redirect_is_followed(api, server):
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (
+            301,
+            {"message": "Moved Permanently"},
+            {"Location": f"{url}/repositories/42/pulls/1"},
+        )
+    ]
+    assert api.get("pulls/1").json() == {"path": "/repositories/42/pulls/1"}
+
+
+def test_post_redirect_is_resent(api, server):
+    server.replies["/repos/test/repo/issues/1/comments"] = [
+        (307, {}, {"Location": "/repositories/42/issues/1/comments"})
+    ]
+    response = api.post("issues/1/comments", {"body": "hello"})
+    assert response.status_code == 201
+    assert response.json() == {"path": "/repositories/42/issues/1/comments"}
+
+
+def test_redirect_to_other_host_raises(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [
+        (302, {}, {"Location": "https://example.com/pulls/1"})
+    ]
+    with pytest.raises(BoussoleError) as exc_info:
+        api.get("pulls/1")
+    assert exc_info.value.status_code == 302
+    assert len(server.requests) == 1
+
+
+def test_http_error_raises(api, server):
+    server.replies["/repos/test/repo/pulls/1"] = [(404, {"message": "Not Found"})]
+    with pytest.raises(BoussoleError):
+        api.get("pulls/1")
+
+
+def test_etag_revalidation(api, server):
+    server.etags["/repos/test/repo/pulls/1"] = '"v1"'
+    assert api.get("pulls/1").json() == {"path": "/repos/test/repo/pulls/1"}
+    # A fresh body would only be sent if the ETag did not match
+    server.replies["/repos/test/repo/pulls/1"] = [(200, {"stale": True})]
+    second = api.get("pulls/1")
+    assert second.status_code == 200
+    assert second.json() == {"path": "/repos/test/repo/pulls/1"}
+    assert len(server.requests) == 2
+
+
+def test_etag_revalidation_keeps_links(api, server):
+    base = "/repos/test/repo/issues/1/labels"
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    first = f"{base}?per_page=100"
+    server.etags[first] = '"v1"'
+    server.replies[first] = [(200, [1, 2])]
+    server.links[first] = f'<{url}{base}?page=2>; rel="next"'
+    server.replies[f"{base}?page=2"] = [(200, [3]), (200, [3])]
+    assert api.get_paginated("issues/1/labels") == [1, 2, 3]
+    # The 304 for the first page carries no Link header
+    assert api.get_paginated("issues/1/labels") == [1, 2, 3]
+    assert len(server.requests) == 4
+
+
+def test_etag_cache_persists(api, server, tmp_path):
+    cache = str(tmp_path / "etags.json")
+    server.etags["/repos/test/repo/pulls/1"] = '"v1"'
+    first = GitHubAPI(api.base_url, {}, etag_cache_path=cache)
+    first.get("pulls/1")
+    first.close()
+    # The temporary file is renamed over the cache
+    assert [path.name for path in tmp_path.iterdir()] == ["etags.json"]
+
+    server.replies["/repos/test/repo/pulls/1"] = [(200, {"stale": True})]
+    second = GitHubAPI(api.base_url, {}, etag_cache_path=cache)
+    assert second.get("pulls/1").json() == {"path": "/repos/test/repo/pulls/1"}
+    second.close()
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["not json", "[]", "null", '{"url": ["etag"]}', '{"url": ["etag", 1, null]}'],
+)
+def test_etag_cache_malformed(api, tmp_path, content):
+    cache = tmp_path / "etags.json"
+    cache.write_text(content, encoding="utf-8")
+    client = GitHubAPI(api.base_url, {}, etag_cache_path=str(cache))
+    assert client.get("pulls/1").json() == {"path": "/repos/test/repo/pulls/1"}
+    client.close()
+
+
+def test_etag_cache_keeps_recent_entries(api, server, tmp_path):
+    cache = str(tmp_path / "etags.json")
+    for number in (1, 2, 3):
+        server.etags[f"/repos/test/repo/pulls/{number}"] = f'"v{number}"'
+    client = GitHubAPI(api.base_url, {}, etag_cache_path=cache)
+    client.etag_cache_size = 2
+    for number in (1, 2, 1, 3):
+        client.get(f"pulls/{number}")
+    client.close()
+
+    with open(cache, encoding="utf-8") as cache_file:
+        urls = list(json.load(cache_file))
+    # pulls/2 is the least recently used once pulls/1 got revalidated
+    assert urls == [f"{api.base_url}/pulls/1", f"{api.base_url}/pulls/3"]
+
+    # A changed page fetched again counts as used too
+    server.etags["/repos/test/repo/pulls/1"] = '"v4"'
+    client = GitHubAPI(api.base_url, {}, etag_cache_path=cache)
+    client.etag_cache_size = 1
+    for number in (2, 1):
+        client.get(f"pulls/{number}")
+    client.close()
+
+    with open(cache, encoding="utf-8") as cache_file:
+        assert list(json.load(cache_file)) == [f"{api.base_url}/pulls/1"]
+
+
+def test_get_paginated_follows_next(api, server):
+    base = "/repos/test/repo/issues/1/comments"
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    server.replies[f"{base}?per_page=100"] = [(200, [1, 2])]
+    server.links[f"{base}?per_page=100"] = f'<{url}{base}?page=2>; rel="next"'
+    server.replies[f"{base}?page=2"] = [(200, [3])]
+    assert api.get_paginated("issues/1/comments") == [1, 2, 3]
+
+
+def test_get_paginated_prefetches_until_last(api, server):
+    base = "/repos/test/repo/commits/abc/check-runs"
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    first = f"{base}?per_page=100"
+    server.replies[first] = [(200, {"check_runs": ["a"]})]
+    server.links[first] = (
+        f'<{url}{base}?per_page=100&page=2>; rel="next", '
+        f'<{url}{base}?per_page=100&page=3>; rel="last"'
+    )
+    for page in (2, 3):
+        server.replies[f"{first}&page={page}"] = [(200, {"check_runs": [str(page)]})]
+
+    assert api.get_paginated("commits/abc/check-runs", key="check_runs") == [
+        "a",
+        "2",
+        "3",
+    ]
+    assert len(server.requests) == 3
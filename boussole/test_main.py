@@ -1,8 +1,15 @@
 import sys
+from unittest.mock import MagicMock
 
 import pytest
 
-from boussole.boussole import PRHandler, main  # Import main and PRHandler
+from boussole.arguments import parse_args
+from boussole.boussole import (
+    LGTMError,
+    PRHandler,
+    main,
+    run_command,
+)
 
 
 # Dummy response to simulate successful API call.
@@ -77,6 +84,98 @@ def test_main_help_success(monkeypatch, capsys):
     assert "help" in captured.lower() or captured == ""
 
 
+# Commenting commands don't need the PR state.
+def test_main_label_skips_status_check(monkeypatch):
+    dummy = DummyResponse(200, "OK")
+
+    def fail_check_status(*_):
+        pytest.fail("check_status should not be called for /label")
+
+    monkeypatch.setattr(PRHandler, "label", lambda self, labels: dummy)
+    monkeypatch.setattr(PRHandler, "check_status", fail_check_status)
+    monkeypatch.setattr(PRHandler, "check_response", lambda self, resp: True)
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "/label bug",
+    ]
+
+    main()
+
+
+# A directory, like a Tekton workspace, gets the ETag cache file created in it.
+def test_parse_args_etag_cache_directory(tmp_path):
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "/lgtm",
+        "--etag-cache",
+        str(tmp_path),
+    ]
+
+    assert parse_args().etag_cache == str(tmp_path / "etags.json")
+
+
+# Commands can run on an already built handler, without main().
+def test_run_command_merge():
+    pr_handler = MagicMock(spec=PRHandler)
+    pr_handler.pr_num = "1"
+    pr_handler.check_status.return_value = True
+
+    run_command(pr_handler, "merge", [])
+
+    pr_handler.check_status.assert_called_once_with("1", "open", bundle=True)
+    pr_handler.merge_pr.assert_called_once_with()
+
+
+# A failed LGTM scan ends the run with an error.
+def test_run_command_lgtm_error():
+    pr_handler = MagicMock(spec=PRHandler)
+    pr_handler.pr_num = "1"
+    pr_handler.check_status.return_value = True
+    pr_handler.lgtm.side_effect = LGTMError("Unable to fetch the PR comments")
+
+    with pytest.raises(SystemExit) as exc_info:
+        run_command(pr_handler, "lgtm", [])
+    assert exc_info.value.code == 1
+
+
+# The light commands only read the PR state, not the whole bundle.
+def test_run_command_rebase():
+    pr_handler = MagicMock(spec=PRHandler)
+    pr_handler.pr_num = "1"
+    pr_handler.check_status.return_value = True
+    pr_handler.rebase.return_value = None
+
+    run_command(pr_handler, "rebase", [])
+
+    pr_handler.check_status.assert_called_once_with("1", "open", bundle=False)
+
+
 # Test for the main function with an invalid command.
 def test_main_invalid_command(monkeypatch):
     # Set sys.argv with a trigger comment that does not match a valid command.